@@ -0,0 +1,249 @@
+# Shared runtime of the backend functions: connection pool, JWT check, sampled phase timing
+# and the prebuilt CORS responses. Every function is deployed from its own directory, so
+# scripts/sync_runtime.py copies this file (backend/_runtime/runtime.py) into each
+# backend/<function>/runtime.py. Edit it here and re-run the script; its --check fails on drift.
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Tuple
+
+# Heavy modules (psycopg_pool, jwt) are imported on first use, so a CORS
+# preflight or an early rejection never pays for loading them
+if TYPE_CHECKING:
+    from psycopg_pool import ConnectionPool
+
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '4'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+_db_pool: Optional['ConnectionPool'] = None
+# Serialises the first creation, so concurrent first requests cannot each open a pool
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool(database_url: str) -> 'ConnectionPool':
+    """
+    Business: Lazily create the container-wide connection pool reused by warm invocations
+    Args: database_url - DATABASE_URL connection string
+    Returns: Open ConnectionPool; broken connections are discarded and replaced on checkout
+    """
+    global _db_pool
+    
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                from psycopg_pool import ConnectionPool
+                
+                _db_pool = ConnectionPool(
+                    database_url,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=max(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+                    timeout=DB_POOL_TIMEOUT,
+                    check=ConnectionPool.check_connection,
+                    open=True
+                )
+    
+    return _db_pool
+
+
+# Verified JWT claims keyed by a digest of secret + token, so repeat requests skip HS256 verification
+JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', '1024'))
+
+_jwt_cache: 'OrderedDict[bytes, Dict[str, Any]]' = OrderedDict()
+# Held only around the cache bookkeeping, never across jwt.decode
+_jwt_cache_lock = threading.Lock()
+# Logged on their own line at most every JWT_CACHE_LOG_SECONDS per container (0 disables),
+# and on every sampled timing line
+jwt_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+JWT_CACHE_LOG_SECONDS = float(os.environ.get('JWT_CACHE_LOG_SECONDS', '60'))
+_jwt_cache_logged_at = time.monotonic()
+
+
+def decode_token(token: str, jwt_secret: str) -> Optional[Dict[str, Any]]:
+    """
+    Business: Verify a JWT through a bounded LRU cache of verified claims that honours exp
+    Args: token - raw bearer token, jwt_secret - HS256 signing secret
+    Returns: Verified claims, or None for an invalid or expired token
+    """
+    key = hashlib.sha256(f'{jwt_secret}:{token}'.encode('utf-8')).digest()
+    
+    with _jwt_cache_lock:
+        claims = _jwt_cache.get(key)
+        if claims is not None:
+            exp = claims.get('exp')
+            if exp is None or exp > time.time():
+                _jwt_cache.move_to_end(key)
+                jwt_cache_stats['hits'] += 1
+                return claims
+            del _jwt_cache[key]
+        jwt_cache_stats['misses'] += 1
+    
+    import jwt
+    
+    try:
+        claims = jwt.decode(token, jwt_secret, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    
+    with _jwt_cache_lock:
+        _jwt_cache[key] = claims
+        if len(_jwt_cache) > JWT_CACHE_SIZE:
+            _jwt_cache.popitem(last=False)
+            jwt_cache_stats['evictions'] += 1
+    
+    return claims
+
+
+def log_jwt_cache_stats(function_name: str) -> None:
+    """
+    Business: Emit the container's JWT cache counters once JWT_CACHE_LOG_SECONDS have passed since the last time
+    Args: function_name - function label for the log line
+    Returns: None; prints one JSON line when due
+    """
+    global _jwt_cache_logged_at
+    
+    if not JWT_CACHE_LOG_SECONDS:
+        return
+    now = time.monotonic()
+    with _jwt_cache_lock:
+        if now - _jwt_cache_logged_at < JWT_CACHE_LOG_SECONDS:
+            return
+        _jwt_cache_logged_at = now
+        stats = dict(jwt_cache_stats, size=len(_jwt_cache))
+    
+    print(json.dumps({'jwt_cache': function_name, **stats}))
+
+
+# Fraction of requests that get per-phase timings (Server-Timing header + one log line); 0 disables
+TIMING_SAMPLE_RATE = float(os.environ.get('TIMING_SAMPLE_RATE', '0'))
+
+
+class PhaseTimer:
+    """
+    Lap timer for one sampled request: each lap() closes the phase that started at the
+    previous lap, finish() emits the Server-Timing header and a structured log line
+    that also carries the container's JWT cache counters.
+    """
+    
+    def __init__(self, function_name: str):
+        self.function_name = function_name
+        self.started = self.last = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+    
+    def lap(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+    
+    def finish(self, response: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        now = time.perf_counter()
+        phases = self.phases + [('rest', (now - self.last) * 1000)]
+        total = (now - self.started) * 1000
+        
+        # Copied, never mutated: responses share the prebuilt header dicts
+        headers = dict(response.get('headers') or {})
+        headers['Server-Timing'] = ', '.join(f'{name};dur={ms:.2f}' for name, ms in phases) + f', total;dur={total:.2f}'
+        headers['Timing-Allow-Origin'] = '*'
+        response = dict(response, headers=headers)
+        
+        print(json.dumps({
+            'timing': self.function_name,
+            'request_id': getattr(context, 'request_id', None),
+            'status': response.get('statusCode'),
+            'total_ms': round(total, 3),
+            'phases': {name: round(ms, 3) for name, ms in phases},
+            'jwt_cache': dict(jwt_cache_stats, size=len(_jwt_cache))
+        }))
+        return response
+
+
+class NullTimer:
+    """Stand-in used for unsampled requests; every call is a no-op"""
+    
+    def lap(self, name: str) -> None:
+        pass
+    
+    def finish(self, response: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        return response
+
+
+NULL_TIMER = NullTimer()
+
+
+def start_timer(function_name: str) -> Any:
+    if TIMING_SAMPLE_RATE and (TIMING_SAMPLE_RATE >= 1 or random.random() < TIMING_SAMPLE_RATE):
+        return PhaseTimer(function_name)
+    return NULL_TIMER
+
+
+# Built once per container and shared by every response; never mutate them
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+JSON_HEADERS = {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'}
+
+
+def preflight_response(allow_methods: str, allow_headers: str = 'Content-Type, Authorization') -> Dict[str, Any]:
+    """
+    Business: Build a function's CORS preflight answer once, at import
+    Args: allow_methods - Access-Control-Allow-Methods value, allow_headers - Access-Control-Allow-Headers value
+    Returns: Response dict to return as is for every OPTIONS request
+    """
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': allow_methods,
+            'Access-Control-Allow-Headers': allow_headers,
+            'Access-Control-Max-Age': '86400'
+        },
+        'body': ''
+    }
+
+
+def run(event: Dict[str, Any], context: Any, function_name: str, preflight: Dict[str, Any],
+        handle_request: Callable[[Dict[str, Any], Any, Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Business: Shared body of every function's handler: CORS preflight first, then a timed request
+    Args: event, context - as passed to handler, function_name - timing label, preflight - prebuilt
+          preflight_response, handle_request - (event, context, timer) -> response
+    Returns: The preflight as is for OPTIONS, before timing or any heavy import; otherwise the
+             response of handle_request, with Server-Timing added when the request is sampled.
+             JWT cache counters are logged here when due
+    """
+    if event.get('httpMethod') == 'OPTIONS':
+        return preflight
+    
+    timer = start_timer(function_name)
+    response = timer.finish(handle_request(event, context, timer), context)
+    log_jwt_cache_stats(function_name)
+    return response
+
+
+def error_response(status: int, message: str) -> Dict[str, Any]:
+    return {'statusCode': status, 'headers': CORS_HEADERS, 'body': json.dumps({'error': message})}
+
+
+def authenticate(event: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Business: Bearer token check shared by every authenticated route
+    Args: event - incoming request with headers containing Authorization token
+    Returns: (claims, None) for a valid token, otherwise (None, error response to return as is)
+    """
+    headers = event.get('headers') or {}
+    auth_header = headers.get('authorization') or headers.get('Authorization')
+    
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None, error_response(401, 'No valid authorization token provided')
+    
+    jwt_secret = os.environ.get('JWT_SECRET')
+    if not jwt_secret:
+        return None, error_response(500, 'JWT secret not configured')
+    
+    claims = decode_token(auth_header[7:], jwt_secret)  # Remove 'Bearer ' prefix
+    if claims is None:
+        return None, error_response(401, 'Invalid or expired token')
+    
+    return claims, None
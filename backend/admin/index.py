@@ -1,9 +1,439 @@
+import csv
+import hashlib
 import json
 import os
-import psycopg
-from typing import Dict, Any
-import jwt
-from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+from runtime import JSON_HEADERS, authenticate, error_response, get_db_pool, preflight_response, run
+
+# Bulk import: rows are validated as they are read and loaded with COPY in chunks
+IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ERRORS = 100
+TRUE_VALUES = {'true', '1', 'yes', 'y', 't'}
+
+
+def iter_lines(data: str, start: int = 0) -> Iterator[str]:
+    """
+    Business: Yield the lines of a payload from an offset by slicing, without copying the whole text
+    Args: data - payload text, start - offset of the first line
+    Returns: Lines including their trailing newline
+    """
+    while start < len(data):
+        end = data.find('\n', start) + 1 or len(data)
+        yield data[start:end]
+        start = end
+
+
+def skip_lines(data: str, start: int, count: int) -> int:
+    for _ in range(count):
+        start = data.find('\n', start) + 1 or len(data)
+    return start
+
+
+def read_csv_records(data: str) -> Iterator[Tuple[int, Any]]:
+    # Strict mode turns a stray or unterminated quote into a csv.Error instead of a field that
+    # silently swallows the lines after it. The error is reported on the line its record starts
+    # on, and a fresh reader resumes on the next line, so the swallowed rows are still read
+    fieldnames = None
+    start = 0
+    line_num = 0
+    
+    while start < len(data):
+        reader = csv.reader(iter_lines(data, start), strict=True)
+        base = line_num
+        try:
+            for fields in reader:
+                record_line = line_num + 1
+                line_num = base + reader.line_num
+                if not fields:
+                    continue
+                if fieldnames is None:
+                    fieldnames = fields
+                    continue
+                yield record_line, dict(zip(fieldnames, fields))
+            return
+        except csv.Error as e:
+            yield line_num + 1, f'Malformed CSV: {str(e)}'
+            if fieldnames is None:
+                return
+            start = skip_lines(data, start, line_num - base + 1)
+            line_num += 1
+
+
+def read_import_records(fmt: str, data: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Business: Lazily read character records from a CSV (with header) or JSONL payload
+    Args: fmt - 'csv' or 'jsonl', data - payload text
+    Returns: (line number, record dict) pairs; an unparseable line yields (line number, error string)
+    """
+    if fmt == 'csv':
+        yield from read_csv_records(data)
+        return
+    
+    for line_num, line in enumerate(iter_lines(data), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_num, 'Invalid JSON'
+            continue
+        yield line_num, record if isinstance(record, dict) else 'Expected a JSON object'
+
+
+def parse_limited_until(value: str) -> datetime:
+    """
+    Business: Parse an ISO limited_until into the naive UTC value the TIMESTAMP column stores
+    Args: value - ISO 8601 string, with or without an offset ('Z' accepted)
+    Returns: naive datetime in UTC; raises ValueError on a bad format
+    """
+    limited_until = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if limited_until.tzinfo is not None:
+        limited_until = limited_until.astimezone(timezone.utc).replace(tzinfo=None)
+    return limited_until
+
+
+def validate_import_record(record: Dict[str, Any], rarity_ids: set, user_id: int) -> Tuple[Optional[tuple], Optional[str]]:
+    """
+    Business: Apply create_character validation to one imported record
+    Args: record - parsed fields, rarity_ids - existing rarity ids, user_id - importing admin
+    Returns: (COPY row without id, None) or (None, error message)
+    """
+    name = str(record.get('name') or '').strip()
+    description = str(record.get('description') or '').strip()
+    image_url = str(record.get('image_url') or '').strip()
+    is_limited = record.get('is_limited', False)
+    limited_until = record.get('limited_until')
+    
+    if not name or record.get('rarity_id') in (None, ''):
+        return None, 'Name and rarity_id are required'
+    if len(name) > 100:
+        return None, 'Name must be at most 100 characters'
+    if len(image_url) > 500:
+        return None, 'image_url must be at most 500 characters'
+    
+    try:
+        rarity_id = int(record['rarity_id'])
+    except (TypeError, ValueError):
+        return None, 'rarity_id must be an integer'
+    if rarity_id not in rarity_ids:
+        return None, f'Rarity {rarity_id} does not exist'
+    
+    if isinstance(is_limited, str):
+        is_limited = is_limited.strip().lower() in TRUE_VALUES
+    is_limited = bool(is_limited)
+    
+    limited_until_dt = None
+    if is_limited and limited_until:
+        try:
+            limited_until_dt = parse_limited_until(str(limited_until))
+        except ValueError:
+            return None, 'Invalid limited_until format. Use ISO format'
+    
+    return (name, description, image_url, rarity_id, is_limited, limited_until_dt, user_id), None
+
+
+def copy_characters(cur: Any, rows: List[tuple]) -> List[int]:
+    # COPY cannot return ids, so reserve them from the sequence first and copy them in explicitly
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence('characters', 'id')) FROM generate_series(1, %s)",
+        (len(rows),)
+    )
+    ids = [row[0] for row in cur.fetchall()]
+    
+    with cur.copy("""
+        COPY characters (id, name, description, image_url, rarity_id, is_limited, limited_until, created_by)
+        FROM STDIN
+    """) as copy:
+        for character_id, row in zip(ids, rows):
+            copy.write_row((character_id,) + row)
+    
+    return ids
+
+
+def add_id_ranges(ranges: List[List[int]], ids: List[int]) -> None:
+    # Inserted ids are kept as [first, last] runs; reserved ids are consecutive unless another
+    # session draws from the sequence at the same time, so this stays a handful of pairs
+    for character_id in ids:
+        if ranges and ranges[-1][1] + 1 == character_id:
+            ranges[-1][1] = character_id
+        else:
+            ranges.append([character_id, character_id])
+
+
+# Admin catalog listing: keyset pagination on (created_at, id), optional projection and filters
+DEFAULT_LISTING_LIMIT = 100
+MAX_LISTING_LIMIT = 500
+
+# Output field -> selected columns, in the order build_listing_item consumes them
+LISTING_COLUMNS = {
+    'id': ['c.id'],
+    'name': ['c.name'],
+    'description': ['c.description'],
+    'image_url': ['c.image_url'],
+    'is_limited': ['c.is_limited'],
+    'limited_until': ['c.limited_until'],
+    'is_active': ['c.is_active'],
+    'rarity': ['r.name', 'r.color']
+}
+
+LISTING_FILTERS = {
+    'active': 'c.is_active',
+    'limited': 'c.is_limited'
+}
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise ValueError(f'Invalid boolean: {value}')
+
+
+def parse_listing_params(params: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Business: Validate admin listing query parameters
+    Args: params - queryStringParameters (limit, cursor, fields, active, limited, rarity_id)
+    Returns: Normalized listing options; raises ValueError with a client-facing message
+    """
+    try:
+        limit = int(params.get('limit', DEFAULT_LISTING_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    
+    fields = list(LISTING_COLUMNS)
+    if params.get('fields'):
+        fields = [field.strip() for field in params['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in LISTING_COLUMNS]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    
+    cursor = None
+    if params.get('cursor'):
+        try:
+            created_at, char_id = params['cursor'].rsplit(',', 1)
+            cursor = (datetime.fromisoformat(created_at), int(char_id))
+        except ValueError:
+            raise ValueError('Invalid cursor')
+    
+    filters = []
+    for name, column in LISTING_FILTERS.items():
+        if params.get(name):
+            filters.append((column, parse_bool(params[name])))
+    if params.get('rarity_id'):
+        try:
+            filters.append(('c.rarity_id', int(params['rarity_id'])))
+        except ValueError:
+            raise ValueError('rarity_id must be an integer')
+    
+    return {
+        'limit': max(1, min(limit, MAX_LISTING_LIMIT)),
+        'fields': fields,
+        'cursor': cursor,
+        'filters': filters
+    }
+
+
+def build_listing_query(listing: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Business: Build the SQL for one listing page, newest first; one extra row tells whether more exist
+    Args: listing - options from parse_listing_params
+    Returns: (query, parameters)
+    """
+    columns = [column for field in listing['fields'] for column in LISTING_COLUMNS[field]]
+    conditions = [f'{column} = %s' for column, _ in listing['filters']]
+    query_params = [value for _, value in listing['filters']]
+    
+    if listing['cursor']:
+        conditions.append('(c.created_at, c.id) < (%s, %s)')
+        query_params.extend(listing['cursor'])
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    
+    query = f"""
+        SELECT c.created_at, c.id, {', '.join(columns)}
+        FROM characters c
+        JOIN rarities r ON c.rarity_id = r.id
+        {where}
+        ORDER BY c.created_at DESC, c.id DESC
+        LIMIT %s
+    """
+    return query, query_params + [listing['limit'] + 1]
+
+
+def build_listing_item(fields: List[str], values: tuple) -> Dict[str, Any]:
+    item = {}
+    i = 0
+    for field in fields:
+        if field == 'rarity':
+            item['rarity'] = {'name': values[i], 'color': values[i + 1]}
+            i += 2
+        elif field == 'limited_until':
+            item['limited_until'] = values[i].isoformat() if values[i] else None
+            i += 1
+        else:
+            item[field] = values[i]
+            i += 1
+    return item
+
+
+def listing_etag(version: int, params: Dict[str, str]) -> str:
+    # The body depends on the catalog version and on every query parameter
+    canonical = json.dumps(sorted(params.items()))
+    return f'"catalog-{version}-{hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]}"'
+
+
+# Upper bound on cached listing items per catalog version (one per character and field selection)
+LISTING_FRAGMENT_CACHE_SIZE = int(os.environ.get('LISTING_FRAGMENT_CACHE_SIZE', '50000'))
+
+
+class ListingFragments:
+    """
+    Pre-encoded listing JSON for one catalog version: character items by field selection
+    and id, and the whole rarities list. Replaced, never cleared, when the version moves,
+    so a request still holding the old instance cannot write into the new one.
+    """
+    
+    def __init__(self, version: int):
+        self.version = version
+        self.characters: Dict[Tuple[Tuple[str, ...], int], str] = {}
+        self.rarities: Optional[str] = None
+    
+    def character(self, fields: Tuple[str, ...], row: tuple) -> str:
+        # row is (created_at, id, *columns) as selected by the listing query
+        key = (fields, row[1])
+        encoded = self.characters.get(key)
+        if encoded is None:
+            encoded = json.dumps(build_listing_item(list(fields), row[2:]))
+            if len(self.characters) < LISTING_FRAGMENT_CACHE_SIZE:
+                self.characters[key] = encoded
+        return encoded
+
+
+_listing_fragments: Optional[ListingFragments] = None
+
+
+def get_listing_fragments(version: int) -> ListingFragments:
+    global _listing_fragments
+    
+    if _listing_fragments is None or _listing_fragments.version != version:
+        _listing_fragments = ListingFragments(version)
+    return _listing_fragments
+
+
+def listing_body(fragments: ListingFragments, fields: List[str], rows: List[tuple],
+                 next_cursor: Optional[str], rarities: Optional[str]) -> str:
+    """
+    Business: Assemble the listing body from cached fragments around the per-page fields
+    Args: fragments - current ListingFragments, fields, page rows, next_cursor, encoded rarities (first page only)
+    Returns: JSON text, byte for byte what json.dumps gives for the same response dict
+    """
+    key = tuple(fields)
+    characters = ', '.join(fragments.character(key, row) for row in rows)
+    body = (
+        f'{{"characters": [{characters}], "next_cursor": {json.dumps(next_cursor)}, '
+        f'"catalog_version": {json.dumps(fragments.version)}'
+    )
+    return f'{body}, "rarities": {rarities}}}' if rarities is not None else f'{body}}}'
+
+
+# Drop statistics: windows are whole hours read from the drop_stats_rarity_hourly,
+# drop_stats_hourly and collector_stats rollups
+DEFAULT_STATS_HOURS = 24
+MAX_STATS_HOURS = 24 * 90
+DEFAULT_LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+STATS_BUCKETS = ('hour', 'day')
+
+# Observed drops per rarity vs the rate the spin pool is configured for: every character
+# in the pool weighs its rarity's chance
+STATS_RARITY_QUERY = """
+    SELECT r.id, r.name, r.color, r.chance, COALESCE(pool.characters, 0),
+           COALESCE(dropped.drops, 0)
+    FROM rarities r
+    LEFT JOIN (
+        SELECT rarity_id, COUNT(*) AS characters
+        FROM characters
+        WHERE is_active = true AND (is_limited = false OR limited_until > %(now)s)
+        GROUP BY rarity_id
+    ) pool ON pool.rarity_id = r.id
+    LEFT JOIN (
+        SELECT rarity_id, SUM(drops) AS drops
+        FROM drop_stats_rarity_hourly
+        WHERE hour >= %(since)s
+        GROUP BY rarity_id
+    ) dropped ON dropped.rarity_id = r.id
+    ORDER BY r.chance DESC
+"""
+
+# Drops per rarity per hour or day bucket
+STATS_SERIES_QUERY = """
+    SELECT date_trunc(%(bucket)s, hour), rarity_id, SUM(drops)
+    FROM drop_stats_rarity_hourly
+    WHERE hour >= %(since)s
+    GROUP BY 1, 2
+    ORDER BY 1
+"""
+
+STATS_TOP_CHARACTERS_QUERY = """
+    SELECT s.character_id, c.name, r.name, SUM(s.drops)
+    FROM drop_stats_hourly s
+    JOIN characters c ON c.id = s.character_id
+    JOIN rarities r ON r.id = s.rarity_id
+    WHERE s.hour >= %(since)s
+    GROUP BY s.character_id, c.name, r.name
+    ORDER BY SUM(s.drops) DESC, s.character_id
+    LIMIT %(limit)s
+"""
+
+# Leaderboards, read straight off the collector_stats indexes
+STATS_COLLECTORS_QUERY = """
+    SELECT cs.user_id, u.username, cs.unique_characters, cs.pulls
+    FROM collector_stats cs
+    JOIN users u ON u.id = cs.user_id
+    ORDER BY cs.unique_characters DESC, cs.pulls DESC
+    LIMIT %(limit)s
+"""
+
+STATS_PULLERS_QUERY = """
+    SELECT cs.user_id, u.username, cs.unique_characters, cs.pulls
+    FROM collector_stats cs
+    JOIN users u ON u.id = cs.user_id
+    ORDER BY cs.pulls DESC
+    LIMIT %(limit)s
+"""
+
+
+def parse_stats_params(body_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Business: Validate the stats action options
+    Args: body_data - request body (hours, bucket, limit)
+    Returns: Normalized stats options; raises ValueError with a client-facing message
+    """
+    hours = body_data.get('hours', DEFAULT_STATS_HOURS)
+    limit = body_data.get('limit', DEFAULT_LEADERBOARD_SIZE)
+    bucket = body_data.get('bucket', 'hour')
+    
+    if not isinstance(hours, int) or isinstance(hours, bool) or not 1 <= hours <= MAX_STATS_HOURS:
+        raise ValueError(f'hours must be an integer between 1 and {MAX_STATS_HOURS}')
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_LEADERBOARD_SIZE:
+        raise ValueError(f'limit must be an integer between 1 and {MAX_LEADERBOARD_SIZE}')
+    if bucket not in STATS_BUCKETS:
+        raise ValueError(f'bucket must be one of: {", ".join(STATS_BUCKETS)}')
+    
+    now = datetime.utcnow()
+    return {
+        'since': (now - timedelta(hours=hours - 1)).replace(minute=0, second=0, microsecond=0),
+        'now': now,
+        'bucket': bucket,
+        'limit': limit
+    }
+
+
+PREFLIGHT_RESPONSE = preflight_response('GET, POST, PUT, DELETE, OPTIONS', 'Content-Type, Authorization, If-None-Match')
+
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -11,106 +441,98 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Args: event with httpMethod, headers with auth token, body with admin actions
     Returns: Success/error response for admin operations
     """
+    return run(event, context, 'admin', PREFLIGHT_RESPONSE, handle_request)
+
+
+def handle_request(event: Dict[str, Any], context: Any, timer: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'GET')
     
-    # Handle CORS OPTIONS request
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
     try:
         # Verify admin authentication
-        headers = event.get('headers', {})
-        auth_header = headers.get('authorization') or headers.get('Authorization')
+        payload, error = authenticate(event)
+        if error:
+            return error
+        user_id = payload.get('user_id')
         
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return {
-                'statusCode': 401,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'No valid authorization token provided'})
-            }
+        if not payload.get('is_admin', False):
+            return error_response(403, 'Admin access required')
         
-        token = auth_header[7:]
-        jwt_secret = 'rng_game_secret_key_2024'
+        headers = event.get('headers') or {}
         
-        try:
-            payload = jwt.decode(token, jwt_secret, algorithms=['HS256'])
-            user_id = payload.get('user_id')
-            is_admin = payload.get('is_admin', False)
-            
-            if not is_admin:
-                return {
-                    'statusCode': 403,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Admin access required'})
-                }
-        except jwt.InvalidTokenError:
-            return {
-                'statusCode': 401,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Invalid or expired token'})
-            }
+        timer.lap('jwt')
         
         database_url = os.environ.get('DATABASE_URL')
         if not database_url:
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Database connection not configured'})
-            }
+            return error_response(500, 'Database connection not configured')
         
-        with psycopg.connect(database_url) as conn:
+        with get_db_pool(database_url).connection() as conn:
             with conn.cursor() as cur:
+                timer.lap('db_connect')
+                
                 if method == 'GET':
-                    # Get all characters and rarities for admin view
-                    cur.execute("""
-                        SELECT c.id, c.name, c.description, c.image_url, c.is_limited, c.limited_until,
-                               c.is_active, r.name as rarity_name, r.color as rarity_color
-                        FROM characters c
-                        JOIN rarities r ON c.rarity_id = r.id
-                        ORDER BY c.created_at DESC
-                    """)
+                    params = event.get('queryStringParameters') or {}
+                    try:
+                        listing = parse_listing_params(params)
+                    except ValueError as e:
+                        return error_response(400, str(e))
+                    
+                    # Unchanged catalog + same parameters: answer 304 before running the join
+                    cur.execute("SELECT version FROM catalog_version WHERE id = 1")
+                    version = cur.fetchone()[0]
+                    etag = listing_etag(version, params)
+                    
+                    if_none_match = headers.get('if-none-match') or headers.get('If-None-Match')
+                    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+                        return {
+                            'statusCode': 304,
+                            'headers': {
+                                'Access-Control-Allow-Origin': '*',
+                                'Access-Control-Expose-Headers': 'ETag',
+                                'ETag': etag,
+                                'Cache-Control': 'private, no-cache'
+                            },
+                            'body': ''
+                        }
+                    
+                    fields = listing['fields']
+                    cur.execute(*build_listing_query(listing))
                     characters = cur.fetchall()
                     
-                    cur.execute("SELECT id, name, color, chance FROM rarities ORDER BY chance DESC")
-                    rarities = cur.fetchall()
+                    has_more = len(characters) > listing['limit']
+                    characters = characters[:listing['limit']]
+                    next_cursor = None
+                    if has_more:
+                        next_cursor = f"{characters[-1][0].isoformat()},{characters[-1][1]}"
                     
-                    return {
-                        'statusCode': 200,
-                        'headers': {
-                            'Access-Control-Allow-Origin': '*',
-                            'Content-Type': 'application/json'
-                        },
-                        'body': json.dumps({
-                            'characters': [
-                                {
-                                    'id': char[0],
-                                    'name': char[1],
-                                    'description': char[2],
-                                    'image_url': char[3],
-                                    'is_limited': char[4],
-                                    'limited_until': char[5].isoformat() if char[5] else None,
-                                    'is_active': char[6],
-                                    'rarity': {'name': char[7], 'color': char[8]}
-                                } for char in characters
-                            ],
-                            'rarities': [
+                    fragments = get_listing_fragments(version)
+                    
+                    # Rarities are small; send them with the first page only. Encoded once per
+                    # catalog version, so later first pages skip the query too
+                    rarities = None
+                    if not listing['cursor']:
+                        rarities = fragments.rarities
+                        if rarities is None:
+                            cur.execute("SELECT id, name, color, chance FROM rarities ORDER BY chance DESC")
+                            rarities = fragments.rarities = json.dumps([
                                 {
                                     'id': r[0],
                                     'name': r[1], 
                                     'color': r[2],
                                     'chance': float(r[3])
-                                } for r in rarities
-                            ]
-                        })
+                                } for r in cur.fetchall()
+                            ])
+                    timer.lap('query')
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': {
+                            'Access-Control-Allow-Origin': '*',
+                            'Access-Control-Expose-Headers': 'ETag',
+                            'Content-Type': 'application/json',
+                            'ETag': etag,
+                            'Cache-Control': 'private, no-cache'
+                        },
+                        'body': listing_body(fragments, fields, characters, next_cursor, rarities)
                     }
                 
                 elif method == 'POST':
@@ -126,23 +548,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         limited_until = body_data.get('limited_until')
                         
                         if not name or not rarity_id:
-                            return {
-                                'statusCode': 400,
-                                'headers': {'Access-Control-Allow-Origin': '*'},
-                                'body': json.dumps({'error': 'Name and rarity_id are required'})
-                            }
+                            return error_response(400, 'Name and rarity_id are required')
                         
                         # Parse limited_until if provided
                         limited_until_dt = None
                         if is_limited and limited_until:
                             try:
-                                limited_until_dt = datetime.fromisoformat(limited_until.replace('Z', '+00:00'))
+                                limited_until_dt = parse_limited_until(limited_until)
                             except ValueError:
-                                return {
-                                    'statusCode': 400,
-                                    'headers': {'Access-Control-Allow-Origin': '*'},
-                                    'body': json.dumps({'error': 'Invalid limited_until format. Use ISO format'})
-                                }
+                                return error_response(400, 'Invalid limited_until format. Use ISO format')
                         
                         cur.execute("""
                             INSERT INTO characters (name, description, image_url, rarity_id, is_limited, limited_until, created_by)
@@ -151,13 +565,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         """, (name, description, image_url, rarity_id, is_limited, limited_until_dt, user_id))
                         
                         character_id = cur.fetchone()[0]
+                        timer.lap('write')
                         
                         return {
                             'statusCode': 201,
-                            'headers': {
-                                'Access-Control-Allow-Origin': '*',
-                                'Content-Type': 'application/json'
-                            },
+                            'headers': JSON_HEADERS,
                             'body': json.dumps({
                                 'success': True,
                                 'character_id': character_id,
@@ -165,28 +577,139 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                             })
                         }
                     
+                    elif action == 'import_characters':
+                        fmt = body_data.get('format', 'csv')
+                        data = body_data.get('data')
+                        
+                        if fmt not in ('csv', 'jsonl') or not isinstance(data, str):
+                            return error_response(400, 'format must be csv or jsonl and data must be a string')
+                        
+                        cur.execute("SELECT id FROM rarities")
+                        rarity_ids = {row[0] for row in cur.fetchall()}
+                        
+                        inserted_ranges = []
+                        inserted_count = 0
+                        errors = []
+                        error_count = 0
+                        chunk = []
+                        
+                        for line_num, record in read_import_records(fmt, data):
+                            if isinstance(record, str):
+                                row, error = None, record
+                            else:
+                                row, error = validate_import_record(record, rarity_ids, user_id)
+                            if error:
+                                error_count += 1
+                                if len(errors) < MAX_IMPORT_ERRORS:
+                                    errors.append({'line': line_num, 'error': error})
+                                continue
+                            
+                            chunk.append(row)
+                            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                                add_id_ranges(inserted_ranges, copy_characters(cur, chunk))
+                                inserted_count += len(chunk)
+                                chunk = []
+                        
+                        if chunk:
+                            add_id_ranges(inserted_ranges, copy_characters(cur, chunk))
+                            inserted_count += len(chunk)
+                        timer.lap('write')
+                        
+                        return {
+                            'statusCode': 201 if inserted_count else 400,
+                            'headers': JSON_HEADERS,
+                            'body': json.dumps({
+                                'success': bool(inserted_count),
+                                'inserted_count': inserted_count,
+                                'inserted_id_ranges': inserted_ranges,
+                                'errors': errors,
+                                'error_count': error_count,
+                                'message': f'Imported {inserted_count} characters, {error_count} rows rejected'
+                            })
+                        }
+                    
+                    elif action == 'stats':
+                        try:
+                            stats = parse_stats_params(body_data)
+                        except ValueError as e:
+                            return error_response(400, str(e))
+                        
+                        cur.execute(STATS_RARITY_QUERY, stats)
+                        rarity_rows = cur.fetchall()
+                        
+                        total_drops = sum(row[5] for row in rarity_rows)
+                        total_weight = sum(float(row[3]) * row[4] for row in rarity_rows)
+                        rarity_names = {row[0]: row[1] for row in rarity_rows}
+                        
+                        cur.execute(STATS_SERIES_QUERY, stats)
+                        series: Dict[datetime, Dict[str, int]] = {}
+                        for start, rarity_id, drops in cur.fetchall():
+                            series.setdefault(start, {})[rarity_names.get(rarity_id, str(rarity_id))] = drops
+                        
+                        cur.execute(STATS_TOP_CHARACTERS_QUERY, stats)
+                        top_characters = cur.fetchall()
+                        
+                        cur.execute(STATS_COLLECTORS_QUERY, stats)
+                        collectors = cur.fetchall()
+                        
+                        cur.execute(STATS_PULLERS_QUERY, stats)
+                        pullers = cur.fetchall()
+                        timer.lap('query')
+                        
+                        return {
+                            'statusCode': 200,
+                            'headers': JSON_HEADERS,
+                            'body': json.dumps({
+                                'since': stats['since'].isoformat(),
+                                'bucket': stats['bucket'],
+                                'total_drops': total_drops,
+                                'rarities': [
+                                    {
+                                        'id': row[0],
+                                        'name': row[1],
+                                        'color': row[2],
+                                        'chance': float(row[3]),
+                                        'pool_characters': row[4],
+                                        'configured_rate': float(row[3]) * row[4] / total_weight if total_weight else 0.0,
+                                        'observed_rate': row[5] / total_drops if total_drops else 0.0,
+                                        'drops': row[5]
+                                    } for row in rarity_rows
+                                ],
+                                'series': [
+                                    {'start': start.isoformat(), 'drops': drops}
+                                    for start, drops in series.items()
+                                ],
+                                'top_characters': [
+                                    {'id': row[0], 'name': row[1], 'rarity': row[2], 'drops': row[3]}
+                                    for row in top_characters
+                                ],
+                                'leaderboards': {
+                                    'collectors': [
+                                        {'user_id': row[0], 'username': row[1], 'unique_characters': row[2], 'pulls': row[3]}
+                                        for row in collectors
+                                    ],
+                                    'pullers': [
+                                        {'user_id': row[0], 'username': row[1], 'unique_characters': row[2], 'pulls': row[3]}
+                                        for row in pullers
+                                    ]
+                                }
+                            })
+                        }
+                    
                     elif action == 'create_rarity':
                         name = body_data.get('name', '').strip()
                         color = body_data.get('color', '').strip()
                         chance = body_data.get('chance')
                         
                         if not name or not color or chance is None:
-                            return {
-                                'statusCode': 400,
-                                'headers': {'Access-Control-Allow-Origin': '*'},
-                                'body': json.dumps({'error': 'Name, color and chance are required'})
-                            }
+                            return error_response(400, 'Name, color and chance are required')
                         
                         try:
                             chance = float(chance)
                             if chance < 0 or chance > 1:
                                 raise ValueError("Chance must be between 0 and 1")
                         except ValueError:
-                            return {
-                                'statusCode': 400,
-                                'headers': {'Access-Control-Allow-Origin': '*'},
-                                'body': json.dumps({'error': 'Chance must be a number between 0 and 1'})
-                            }
+                            return error_response(400, 'Chance must be a number between 0 and 1')
                         
                         cur.execute("""
                             INSERT INTO rarities (name, color, chance)
@@ -195,13 +718,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         """, (name, color, chance))
                         
                         rarity_id = cur.fetchone()[0]
+                        timer.lap('write')
                         
                         return {
                             'statusCode': 201,
-                            'headers': {
-                                'Access-Control-Allow-Origin': '*',
-                                'Content-Type': 'application/json'
-                            },
+                            'headers': JSON_HEADERS,
                             'body': json.dumps({
                                 'success': True,
                                 'rarity_id': rarity_id,
@@ -210,28 +731,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         }
                     
                     else:
-                        return {
-                            'statusCode': 400,
-                            'headers': {'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Invalid action'})
-                        }
+                        return error_response(400, 'Invalid action')
                 
                 else:
-                    return {
-                        'statusCode': 405,
-                        'headers': {'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Method not allowed'})
-                    }
+                    return error_response(405, 'Method not allowed')
                     
     except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Invalid JSON in request body'})
-        }
+        return error_response(400, 'Invalid JSON in request body')
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Server error: {str(e)}'})
-        }
\ No newline at end of file
+        return error_response(500, f'Server error: {str(e)}')
\ No newline at end of file
@@ -1,38 +1,76 @@
 import json
 import os
-import bcrypt
-import psycopg
-from typing import Dict, Any, Optional
-import jwt
+import threading
+from typing import TYPE_CHECKING, Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from runtime import JSON_HEADERS, error_response, get_db_pool, preflight_response, run
+
+# Heavy modules (jwt, bcrypt) are imported on first use, so a CORS preflight or an
+# early rejection never pays for loading them
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+# bcrypt cost for new hashes; stored hashes with another cost are rehashed on the next login
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+# Concurrent bcrypt calls per container. bcrypt releases the GIL, so more workers than
+# cores only makes every hash slower
+BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', str(os.cpu_count() or 1)))
+
+_bcrypt_executor: Optional['ThreadPoolExecutor'] = None
+# Serialises the first creation, so a burst of first logins shares one BCRYPT_WORKERS-bounded pool
+_bcrypt_executor_lock = threading.Lock()
+
+
+def run_bcrypt(fn: Any, *args: Any) -> Any:
+    """
+    Business: Run a bcrypt call on the container-wide bounded worker pool
+    Args: fn - bcrypt.hashpw or bcrypt.checkpw, args - its arguments
+    Returns: fn's result; requests beyond BCRYPT_WORKERS queue instead of oversubscribing the CPU
+    """
+    global _bcrypt_executor
+    
+    if _bcrypt_executor is None:
+        with _bcrypt_executor_lock:
+            if _bcrypt_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                
+                _bcrypt_executor = ThreadPoolExecutor(max_workers=max(1, BCRYPT_WORKERS), thread_name_prefix='bcrypt')
+    
+    return _bcrypt_executor.submit(fn, *args).result()
+
+
+def hash_password(password: str) -> str:
+    import bcrypt
+    
+    return run_bcrypt(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def hash_rounds(password_hash: str) -> int:
+    # Modular crypt format: $2b$<cost>$<salt and hash>
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+PREFLIGHT_RESPONSE = preflight_response('POST, OPTIONS')
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Business: User authentication and registration system
     Args: event with httpMethod, body containing username/password
     Returns: JWT token for successful auth, error for failures
     """
+    return run(event, context, 'auth', PREFLIGHT_RESPONSE, handle_request)
+
+
+def handle_request(event: Dict[str, Any], context: Any, timer: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'GET')
     
-    # Handle CORS OPTIONS request
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
     if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'})
-        }
+        return error_response(405, 'Method not allowed')
     
     try:
         body_data = json.loads(event.get('body', '{}'))
@@ -41,123 +79,110 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         password = body_data.get('password', '')
         
         if not username or not password:
-            return {
-                'statusCode': 400,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Username and password required'})
-            }
+            return error_response(400, 'Username and password required')
         
         if len(username) < 3 or len(username) > 50:
-            return {
-                'statusCode': 400,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Username must be 3-50 characters'})
-            }
+            return error_response(400, 'Username must be 3-50 characters')
             
         if len(password) < 6:
-            return {
-                'statusCode': 400,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Password must be at least 6 characters'})
-            }
+            return error_response(400, 'Password must be at least 6 characters')
         
         database_url = os.environ.get('DATABASE_URL')
         if not database_url:
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Database connection not configured'})
-            }
+            return error_response(500, 'Database connection not configured')
+        
+        jwt_secret = os.environ.get('JWT_SECRET')
+        if not jwt_secret:
+            return error_response(500, 'JWT secret not configured')
+        
+        if action not in ('register', 'login'):
+            return error_response(400, 'Invalid action. Use login or register')
+        
+        # Only requests that passed validation load bcrypt and jwt
+        import bcrypt
+        import jwt
+        timer.lap('parse')
+        
+        # bcrypt never runs while a pooled connection is checked out: registration hashes
+        # first, login reads the stored hash and returns the connection before checking it
+        if action == 'register':
+            password_hash = hash_password(password)
+            timer.lap('bcrypt')
+            
+            with get_db_pool(database_url).connection() as conn:
+                timer.lap('db_connect')
+                # One statement and race-free: of concurrent signups for a name exactly one inserts
+                result = conn.execute(
+                    """
+                    INSERT INTO users (username, password_hash) VALUES (%s, %s)
+                    ON CONFLICT (username) DO NOTHING
+                    RETURNING id, is_admin
+                    """,
+                    (username, password_hash)
+                ).fetchone()
+            timer.lap('write')
+            
+            if not result:
+                return error_response(409, 'Username already exists')
+            user_id, is_admin = result
         
-        with psycopg.connect(database_url) as conn:
-            with conn.cursor() as cur:
-                if action == 'register':
-                    # Check if username exists
-                    cur.execute("SELECT id FROM users WHERE username = %s", (username,))
-                    if cur.fetchone():
-                        return {
-                            'statusCode': 409,
-                            'headers': {'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Username already exists'})
-                        }
-                    
-                    # Hash password and create user
-                    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                    cur.execute(
-                        "INSERT INTO users (username, password_hash) VALUES (%s, %s) RETURNING id, is_admin",
-                        (username, password_hash)
+        else:
+            with get_db_pool(database_url).connection() as conn:
+                timer.lap('db_connect')
+                result = conn.execute(
+                    "SELECT id, password_hash, is_admin FROM users WHERE username = %s", (username,)
+                ).fetchone()
+            timer.lap('lookup')
+            
+            if not result:
+                return error_response(401, 'Invalid credentials')
+            
+            user_id, stored_hash, is_admin = result
+            
+            # Verify password
+            password_ok = run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), stored_hash.encode('utf-8'))
+            timer.lap('bcrypt')
+            if not password_ok:
+                return error_response(401, 'Invalid credentials')
+            
+            # Bring hashes made with another cost in line with BCRYPT_ROUNDS while the plain
+            # password is at hand. Guarded on the old hash, so a concurrent change wins
+            if hash_rounds(stored_hash) != BCRYPT_ROUNDS:
+                new_hash = hash_password(password)
+                with get_db_pool(database_url).connection() as conn:
+                    conn.execute(
+                        "UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s",
+                        (new_hash, user_id, stored_hash)
                     )
-                    result = cur.fetchone()
-                    user_id, is_admin = result[0], result[1]
-                    
-                elif action == 'login':
-                    # Get user data
-                    cur.execute("SELECT id, password_hash, is_admin FROM users WHERE username = %s", (username,))
-                    result = cur.fetchone()
-                    
-                    if not result:
-                        return {
-                            'statusCode': 401,
-                            'headers': {'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Invalid credentials'})
-                        }
-                    
-                    user_id, stored_hash, is_admin = result[0], result[1], result[2]
-                    
-                    # Verify password
-                    if not bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
-                        return {
-                            'statusCode': 401,
-                            'headers': {'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({'error': 'Invalid credentials'})
-                        }
-                
-                else:
-                    return {
-                        'statusCode': 400,
-                        'headers': {'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Invalid action. Use login or register'})
-                    }
-                
-                # Generate JWT token
-                token_payload = {
-                    'user_id': user_id,
-                    'username': username,
-                    'is_admin': is_admin,
-                    'exp': datetime.utcnow() + timedelta(days=7),
-                    'iat': datetime.utcnow()
-                }
-                
-                # Use a simple secret for JWT (in production, use a proper secret)
-                jwt_secret = 'rng_game_secret_key_2024'
-                token = jwt.encode(token_payload, jwt_secret, algorithm='HS256')
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {
-                        'Access-Control-Allow-Origin': '*',
-                        'Content-Type': 'application/json'
-                    },
-                    'body': json.dumps({
-                        'token': token,
-                        'user': {
-                            'id': user_id,
-                            'username': username,
-                            'is_admin': is_admin
-                        },
-                        'message': f'Successfully {"registered" if action == "register" else "logged in"}'
-                    })
-                }
-                
-    except json.JSONDecodeError:
+                timer.lap('rehash')
+        
+        # Generate JWT token
+        token_payload = {
+            'user_id': user_id,
+            'username': username,
+            'is_admin': is_admin,
+            'exp': datetime.utcnow() + timedelta(days=7),
+            'iat': datetime.utcnow()
+        }
+        
+        token = jwt.encode(token_payload, jwt_secret, algorithm='HS256')
+        timer.lap('jwt')
+        
         return {
-            'statusCode': 400,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Invalid JSON in request body'})
+            'statusCode': 200,
+            'headers': JSON_HEADERS,
+            'body': json.dumps({
+                'token': token,
+                'user': {
+                    'id': user_id,
+                    'username': username,
+                    'is_admin': is_admin
+                },
+                'message': f'Successfully {"registered" if action == "register" else "logged in"}'
+            })
         }
+        
+    except json.JSONDecodeError:
+        return error_response(400, 'Invalid JSON in request body')
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Server error: {str(e)}'})
-        }
\ No newline at end of file
+        return error_response(500, f'Server error: {str(e)}')
\ No newline at end of file
@@ -0,0 +1,294 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta
+
+from runtime import JSON_HEADERS, authenticate, error_response, get_db_pool, preflight_response, run
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+MAX_MESSAGE_LENGTH = 500
+
+# Long poll: GET ?wait=N sleeps until a NOTIFY on CHAT_NOTIFY_CHANNEL (V0009) announces a newer
+# message, holding no pooled connection meanwhile. The query is re-run at least every
+# CHAT_RECHECK_SECONDS in case the listener missed a notification while reconnecting
+CHAT_MAX_WAIT_SECONDS = float(os.environ.get('CHAT_MAX_WAIT_SECONDS', '20'))
+CHAT_RECHECK_SECONDS = float(os.environ.get('CHAT_RECHECK_SECONDS', '5'))
+CHAT_NOTIFY_CHANNEL = 'chat_message'
+CHAT_LISTEN_READY_SECONDS = 2.0
+CHAT_LISTEN_RETRY_SECONDS = 1.0
+
+# Retention: messages older than CHAT_RETENTION_DAYS or beyond the newest CHAT_MAX_MESSAGES
+# are trimmed in batches, on a sample of posts and by scripts/trim_chat.py
+CHAT_RETENTION_DAYS = int(os.environ.get('CHAT_RETENTION_DAYS', '7'))
+CHAT_MAX_MESSAGES = int(os.environ.get('CHAT_MAX_MESSAGES', '10000'))
+CHAT_TRIM_SAMPLE_RATE = float(os.environ.get('CHAT_TRIM_SAMPLE_RATE', '0.01'))
+CHAT_TRIM_BATCH_SIZE = 1000
+
+# Posts take this transaction-scoped advisory lock before drawing an id, so ids commit in
+# order and an after_id reader can never skip a message that commits late
+CHAT_INSERT_LOCK_KEY = 7301
+
+MESSAGES_QUERY = """
+    SELECT m.id, m.user_id, u.username, m.message, m.created_at
+    FROM chat_messages m
+    LEFT JOIN users u ON u.id = m.user_id
+    WHERE m.id > %s
+    ORDER BY m.id
+    LIMIT %s
+"""
+
+LATEST_MESSAGES_QUERY = """
+    SELECT m.id, m.user_id, u.username, m.message, m.created_at
+    FROM chat_messages m
+    LEFT JOIN users u ON u.id = m.user_id
+    ORDER BY m.id DESC
+    LIMIT %s
+"""
+
+
+def message_to_dict(row: tuple) -> Dict[str, Any]:
+    return {
+        'id': row[0],
+        'user_id': row[1],
+        'username': row[2],
+        'message': row[3],
+        'created_at': row[4].isoformat() if row[4] else None
+    }
+
+
+class ChatListener:
+    """
+    Newest message id announced on CHAT_NOTIFY_CHANNEL. One LISTEN connection per container,
+    outside the pool, opened on a daemon thread on first use and reopened if it drops; every
+    waiting fetch of the container sleeps on its condition.
+    """
+    
+    def __init__(self, database_url: str):
+        self.database_url = database_url
+        self.latest_id = 0
+        self.changed = threading.Condition()
+        self.listening = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+    
+    def start(self) -> bool:
+        # True once LISTEN is in place, so a message committed after the caller's next query
+        # is sure to be announced
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='chat-listener', daemon=True)
+                self.thread.start()
+        return self.listening.wait(CHAT_LISTEN_READY_SECONDS)
+    
+    def run(self) -> None:
+        import psycopg
+        
+        while True:
+            try:
+                with psycopg.connect(self.database_url, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHAT_NOTIFY_CHANNEL}")
+                    self.listening.set()
+                    for notify in conn.notifies():
+                        self.announce(int(notify.payload))
+            except Exception:
+                pass
+            self.listening.clear()
+            time.sleep(CHAT_LISTEN_RETRY_SECONDS)
+    
+    def announce(self, message_id: int) -> None:
+        with self.changed:
+            if message_id > self.latest_id:
+                self.latest_id = message_id
+                self.changed.notify_all()
+    
+    def wait(self, after_id: int, timeout: float) -> bool:
+        with self.changed:
+            return self.changed.wait_for(lambda: self.latest_id > after_id, timeout)
+
+
+_chat_listener: Optional[ChatListener] = None
+_chat_listener_lock = threading.Lock()
+
+
+def get_chat_listener(database_url: str) -> ChatListener:
+    global _chat_listener
+    
+    if _chat_listener is None:
+        with _chat_listener_lock:
+            if _chat_listener is None:
+                _chat_listener = ChatListener(database_url)
+    
+    return _chat_listener
+
+
+def fetch_messages(database_url: str, after_id: Optional[int], limit: int, wait: float, timer: Any) -> Tuple[List[tuple], bool]:
+    """
+    Business: Read messages newer than after_id, long-polling up to wait seconds when there are none
+    Args: database_url - DATABASE_URL, after_id - last id the client has (None = latest page), limit - page size,
+          wait - long-poll timeout in seconds, timer - request phase timer
+    Returns: (message rows in id order, has_more: newer messages exist past this page); an O(new messages)
+             primary key range scan per check, one row past the page to tell has_more
+    """
+    deadline = time.monotonic() + wait
+    listener = None
+    if after_id is not None and wait > 0:
+        listener = get_chat_listener(database_url)
+        if not listener.start():
+            # No listener yet: fall back to re-checking every CHAT_RECHECK_SECONDS
+            listener = None
+        timer.lap('listen')
+    
+    while True:
+        with get_db_pool(database_url).connection() as conn:
+            with conn.cursor() as cur:
+                timer.lap('db_connect')
+                if after_id is None:
+                    cur.execute(LATEST_MESSAGES_QUERY, (limit,))
+                    rows = cur.fetchall()[::-1]
+                else:
+                    cur.execute(MESSAGES_QUERY, (after_id, limit + 1))
+                    rows = cur.fetchall()
+                timer.lap('query')
+        
+        # The latest page has nothing newer past it
+        if after_id is None:
+            return rows, False
+        
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            return rows[:limit], len(rows) > limit
+        
+        timeout = min(CHAT_RECHECK_SECONDS, remaining)
+        if listener:
+            listener.wait(after_id, timeout)
+        else:
+            time.sleep(timeout)
+        timer.lap('wait')
+
+
+def trim_messages(cur: Any, now: datetime) -> int:
+    """
+    Business: Delete chat messages past the retention window or the size cap, one bounded batch each
+    Args: cur - open cursor, now - current UTC time
+    Returns: Number of messages deleted
+    """
+    cur.execute("""
+        DELETE FROM chat_messages
+        WHERE id IN (
+            SELECT id FROM chat_messages
+            WHERE created_at < %s
+            ORDER BY created_at
+            LIMIT %s
+        )
+    """, (now - timedelta(days=CHAT_RETENTION_DAYS), CHAT_TRIM_BATCH_SIZE))
+    deleted = cur.rowcount
+    
+    cur.execute("""
+        DELETE FROM chat_messages
+        WHERE id IN (
+            SELECT id FROM chat_messages
+            WHERE id <= (SELECT MAX(id) FROM chat_messages) - %s
+            ORDER BY id
+            LIMIT %s
+        )
+    """, (CHAT_MAX_MESSAGES, CHAT_TRIM_BATCH_SIZE))
+    return deleted + cur.rowcount
+
+
+PREFLIGHT_RESPONSE = preflight_response('GET, POST, OPTIONS')
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Business: Global chat over chat_messages: post a message, or fetch new ones after a cursor with long polling
+    Args: event with httpMethod, headers containing Authorization token, query params after_id/limit/wait, body with message
+    Returns: Posted message, or messages after the cursor plus the cursor to send next time
+    """
+    return run(event, context, 'chat', PREFLIGHT_RESPONSE, handle_request)
+
+
+def handle_request(event: Dict[str, Any], context: Any, timer: Any) -> Dict[str, Any]:
+    method = event.get('httpMethod', 'GET')
+    
+    if method not in ('GET', 'POST'):
+        return error_response(405, 'Method not allowed')
+    
+    try:
+        # Get and verify JWT token
+        payload, error = authenticate(event)
+        if error:
+            return error
+        user_id = payload.get('user_id')
+        
+        timer.lap('jwt')
+        
+        database_url = os.environ.get('DATABASE_URL')
+        if not database_url:
+            return error_response(500, 'Database connection not configured')
+        
+        if method == 'POST':
+            body_data = json.loads(event.get('body') or '{}')
+            message = body_data.get('message')
+            message = message.strip() if isinstance(message, str) else ''
+            
+            if not message or len(message) > MAX_MESSAGE_LENGTH:
+                return error_response(400, f'Message must be 1 to {MAX_MESSAGE_LENGTH} characters')
+            
+            with get_db_pool(database_url).connection() as conn:
+                with conn.cursor() as cur:
+                    timer.lap('db_connect')
+                    
+                    now = datetime.utcnow()
+                    cur.execute("""
+                        INSERT INTO chat_messages (user_id, message, created_at)
+                        SELECT %s, %s, %s
+                        FROM (SELECT pg_advisory_xact_lock(%s)) AS ordered
+                        RETURNING id, user_id, %s, message, created_at
+                    """, (user_id, message, now, CHAT_INSERT_LOCK_KEY, payload.get('username')))
+                    row = cur.fetchone()
+                    conn.commit()
+                    timer.lap('write')
+                    
+                    # Retention runs on a sample of posts so no single request pays for a big trim
+                    if CHAT_TRIM_SAMPLE_RATE and random.random() < CHAT_TRIM_SAMPLE_RATE:
+                        trim_messages(cur, now)
+                        timer.lap('trim')
+            
+            return {
+                'statusCode': 201,
+                'headers': JSON_HEADERS,
+                'body': json.dumps({'message': message_to_dict(row), 'last_id': row[0]})
+            }
+        
+        # Without after_id the latest page is returned; clients then follow last_id
+        params = event.get('queryStringParameters') or {}
+        try:
+            limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+            after_id = int(params['after_id']) if params.get('after_id') else None
+            wait = float(params.get('wait', 0))
+        except ValueError:
+            return error_response(400, 'limit, after_id and wait must be numbers')
+        
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        wait = max(0.0, min(wait, CHAT_MAX_WAIT_SECONDS))
+        
+        rows, has_more = fetch_messages(database_url, after_id, limit, wait, timer)
+        
+        return {
+            'statusCode': 200,
+            'headers': JSON_HEADERS,
+            'body': json.dumps({
+                'messages': [message_to_dict(row) for row in rows],
+                'last_id': rows[-1][0] if rows else after_id,
+                'has_more': has_more
+            })
+        }
+    
+    except json.JSONDecodeError:
+        return error_response(400, 'Invalid JSON in request body')
+    except Exception as e:
+        return error_response(500, f'Server error: {str(e)}')
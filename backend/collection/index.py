@@ -0,0 +1,102 @@
+import json
+import os
+from typing import Dict, Any
+
+from runtime import JSON_HEADERS, authenticate, error_response, get_db_pool, preflight_response, run
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# One page of the collection, keyset-paginated on the user_collection primary key
+COLLECTION_PAGE_QUERY = """
+    SELECT uc.character_id, c.name, c.description, c.image_url, c.is_limited, c.limited_until,
+           r.name as rarity_name, r.color as rarity_color,
+           uc.count, uc.first_obtained, uc.last_obtained
+    FROM user_collection uc
+    JOIN characters c ON c.id = uc.character_id
+    JOIN rarities r ON c.rarity_id = r.id
+    WHERE uc.user_id = %s AND uc.character_id > %s
+    ORDER BY uc.character_id
+    LIMIT %s
+"""
+
+
+PREFLIGHT_RESPONSE = preflight_response('GET, OPTIONS')
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Business: Paginated read of the user's character collection from the user_collection rollup
+    Args: event with httpMethod, headers containing Authorization token, query params limit/after
+    Returns: Page of owned characters with counts and the cursor for the next page
+    """
+    return run(event, context, 'collection', PREFLIGHT_RESPONSE, handle_request)
+
+
+def handle_request(event: Dict[str, Any], context: Any, timer: Any) -> Dict[str, Any]:
+    method = event.get('httpMethod', 'GET')
+    
+    if method != 'GET':
+        return error_response(405, 'Method not allowed')
+    
+    try:
+        # Get and verify JWT token
+        payload, error = authenticate(event)
+        if error:
+            return error
+        user_id = payload.get('user_id')
+        
+        timer.lap('jwt')
+        
+        # Keyset pagination: 'after' is the last character_id of the previous page
+        params = event.get('queryStringParameters') or {}
+        try:
+            limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+            after = int(params.get('after', 0))
+        except ValueError:
+            return error_response(400, 'limit and after must be integers')
+        
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        database_url = os.environ.get('DATABASE_URL')
+        if not database_url:
+            return error_response(500, 'Database connection not configured')
+        
+        with get_db_pool(database_url).connection() as conn:
+            with conn.cursor() as cur:
+                timer.lap('db_connect')
+                
+                # Fetch one extra row to know whether another page exists
+                cur.execute(COLLECTION_PAGE_QUERY, (user_id, after, limit + 1))
+                rows = cur.fetchall()
+                timer.lap('query')
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return {
+            'statusCode': 200,
+            'headers': JSON_HEADERS,
+            'body': json.dumps({
+                'items': [
+                    {
+                        'character': {
+                            'id': row[0],
+                            'name': row[1],
+                            'description': row[2],
+                            'image_url': row[3],
+                            'is_limited': row[4],
+                            'limited_until': row[5].isoformat() if row[5] else None,
+                            'rarity': {'name': row[6], 'color': row[7]}
+                        },
+                        'count': row[8],
+                        'first_obtained': row[9].isoformat(),
+                        'last_obtained': row[10].isoformat()
+                    } for row in rows
+                ],
+                'next_cursor': rows[-1][0] if has_more else None
+            })
+        }
+    
+    except Exception as e:
+        return error_response(500, f'Server error: {str(e)}')
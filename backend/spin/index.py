@@ -1,195 +1,619 @@
+import bisect
 import json
 import os
-import psycopg
-from typing import Dict, Any
-import jwt
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Dict, Any, List, Optional, Tuple
 import random
 from datetime import datetime, timedelta
 
+from runtime import CORS_HEADERS, JSON_HEADERS, authenticate, error_response, get_db_pool, preflight_response, run
+
+# Upper bound for a multi-pull ("10x spin") request. Every pull in it costs one spin: the
+# hourly cooldown pays for one when it has run out, quest free spins pay for the rest
+MAX_SPINS_PER_REQUEST = int(os.environ.get('MAX_SPINS_PER_REQUEST', '10'))
+
+SPIN_COOLDOWN = timedelta(hours=1)
+
+# Send the spin's writes and COMMIT in one psycopg pipeline flush (set to 0 to fall back
+# to one round trip per statement)
+SPIN_PIPELINE_WRITES = os.environ.get('SPIN_PIPELINE_WRITES', '1') != '0'
+
+# Cooldown gate: users known to be inside their cooldown (with no free spins) are answered
+# 429 from memory. Entries are trusted for at most COOLDOWN_CACHE_TTL_SECONDS, so a grant made
+# elsewhere (another container, an admin reset) is seen within that bound
+COOLDOWN_CACHE_SIZE = int(os.environ.get('COOLDOWN_CACHE_SIZE', '10000'))
+COOLDOWN_CACHE_TTL_SECONDS = int(os.environ.get('COOLDOWN_CACHE_TTL_SECONDS', '300'))
+
+# Pay for all count pulls in one statement, or for none: a cooled-down hourly spin pays for
+# one and quest free spins for the rest. The CTE's outer SELECT sees the pre-update row, so a
+# rejected spin still gets last_spin and free_spins. The catalog version rides along, so
+# unchanged catalogs cost no extra query
+SPIN_CLAIM_QUERY = """
+    WITH claimed AS (
+        UPDATE users
+        SET last_spin = CASE WHEN last_spin IS NULL OR last_spin <= %(cooled_down_at)s
+                THEN %(now)s ELSE last_spin END,
+            free_spins = free_spins - %(count)s + CASE
+                WHEN last_spin IS NULL OR last_spin <= %(cooled_down_at)s THEN 1 ELSE 0 END,
+            total_spins = COALESCE(total_spins, 0) + %(count)s
+        WHERE id = %(user_id)s
+          AND free_spins + CASE
+                WHEN last_spin IS NULL OR last_spin <= %(cooled_down_at)s THEN 1 ELSE 0 END >= %(count)s
+        RETURNING total_spins, last_spin, free_spins
+    )
+    SELECT claimed.total_spins, u.last_spin, claimed.last_spin,
+           COALESCE(claimed.free_spins, u.free_spins),
+           (SELECT version FROM catalog_version WHERE id = 1)
+    FROM users u
+    LEFT JOIN claimed ON true
+    WHERE u.id = %(user_id)s
+"""
+
+# Add all pulled characters to the user's collection and roll them up into user_collection,
+# the per-character and per-rarity hourly drop stats and collector_stats in one statement.
+# obtained_at is offset per pull so duplicates in a batch satisfy
+# UNIQUE(user_id, character_id, obtained_at)
+SPIN_WRITE_QUERY = """
+    WITH inserted AS (
+        INSERT INTO user_characters (user_id, character_id, obtained_at)
+        SELECT %(user_id)s, pulled.character_id, %(now)s::timestamp + pulled.ord * interval '1 microsecond'
+        FROM unnest(%(character_ids)s::int[]) WITH ORDINALITY AS pulled(character_id, ord)
+        RETURNING user_id, character_id, obtained_at
+    ),
+    collected AS (
+        INSERT INTO user_collection (user_id, character_id, count, first_obtained, last_obtained)
+        SELECT user_id, character_id, COUNT(*), MIN(obtained_at), MAX(obtained_at)
+        FROM inserted
+        GROUP BY user_id, character_id
+        ON CONFLICT (user_id, character_id)
+        DO UPDATE SET count = user_collection.count + EXCLUDED.count,
+                      last_obtained = EXCLUDED.last_obtained
+        RETURNING xmax = 0 AS is_new
+    ),
+    pulled AS (
+        SELECT c.id AS character_id, c.rarity_id
+        FROM inserted
+        JOIN characters c ON c.id = inserted.character_id
+    ),
+    hourly AS (
+        INSERT INTO drop_stats_hourly (hour, character_id, rarity_id, drops)
+        SELECT date_trunc('hour', %(now)s::timestamp), character_id, rarity_id, COUNT(*)
+        FROM pulled
+        GROUP BY character_id, rarity_id
+        ON CONFLICT (hour, character_id)
+        DO UPDATE SET drops = drop_stats_hourly.drops + EXCLUDED.drops
+    ),
+    rarity_hourly AS (
+        INSERT INTO drop_stats_rarity_hourly (hour, rarity_id, drops)
+        SELECT date_trunc('hour', %(now)s::timestamp), rarity_id, COUNT(*)
+        FROM pulled
+        GROUP BY rarity_id
+        ON CONFLICT (hour, rarity_id)
+        DO UPDATE SET drops = drop_stats_rarity_hourly.drops + EXCLUDED.drops
+    )
+    INSERT INTO collector_stats (user_id, pulls, unique_characters, last_pull)
+    SELECT %(user_id)s, %(count)s, COUNT(*) FILTER (WHERE is_new), %(now)s
+    FROM collected
+    ON CONFLICT (user_id)
+    DO UPDATE SET pulls = collector_stats.pulls + EXCLUDED.pulls,
+                  unique_characters = collector_stats.unique_characters + EXCLUDED.unique_characters,
+                  last_pull = EXCLUDED.last_pull
+"""
+
+SPIN_POOL_QUERY = """
+    SELECT c.id, c.name, c.description, c.image_url, c.is_limited, c.limited_until,
+           r.name as rarity_name, r.color as rarity_color, r.chance
+    FROM characters c
+    JOIN rarities r ON c.rarity_id = r.id
+    WHERE c.is_active = true 
+    AND (c.is_limited = false OR c.limited_until > %s)
+    ORDER BY r.chance DESC
+"""
+
+# Rate-boost events that have not ended yet. config format:
+# {"rarity_multipliers": {"<rarity name>": 2.0}, "featured_characters": {"<character id>": 5.0}}
+# Overlapping events multiply.
+SPIN_EVENTS_QUERY = """
+    SELECT id, start_time, end_time, config
+    FROM events
+    WHERE event_type = 'rate_boost' AND is_active = true AND end_time > %s
+"""
+
+
+def compile_rate_boosts(rows: List[tuple]) -> List[Tuple[int, datetime, datetime, Dict[str, float], Dict[int, float]]]:
+    """
+    Business: Parse rate_boost event configs once, when the spin pool is loaded
+    Args: rows - (id, start_time, end_time, config) from SPIN_EVENTS_QUERY
+    Returns: (id, start, end, rarity multipliers by name, character multipliers by id); bad entries are skipped
+    """
+    boosts = []
+    for event_id, start_time, end_time, config in rows:
+        if isinstance(config, str):
+            config = json.loads(config)
+        config = config or {}
+        
+        rarity_multipliers = {}
+        for rarity_name, factor in (config.get('rarity_multipliers') or {}).items():
+            try:
+                rarity_multipliers[rarity_name] = max(0.0, float(factor))
+            except (TypeError, ValueError):
+                continue
+        
+        character_multipliers = {}
+        for char_id, factor in (config.get('featured_characters') or {}).items():
+            try:
+                character_multipliers[int(char_id)] = max(0.0, float(factor))
+            except (TypeError, ValueError):
+                continue
+        
+        boosts.append((event_id, start_time, end_time, rarity_multipliers, character_multipliers))
+    
+    return boosts
+
+
+def build_alias_table(weights: List[float]) -> Tuple[List[float], List[int]]:
+    """
+    Business: Vose alias method over character weights for O(1) weighted draws
+    Args: weights - non-negative weight per character
+    Returns: (prob, alias) tables of the same length as weights
+    """
+    n = len(weights)
+    total = sum(weights)
+    if n == 0:
+        return [], []
+    if total <= 0:
+        # Degenerate catalog with all-zero chances: fall back to a uniform draw
+        return [1.0] * n, list(range(n))
+    
+    scaled = [w * n / total for w in weights]
+    prob = [0.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = (scaled[l] + scaled[s]) - 1.0
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+    
+    # Leftovers are 1.0 up to floating point error
+    for i in large + small:
+        prob[i] = 1.0
+    
+    return prob, alias
+
+
+class SpinPool:
+    """
+    Compiled spin pool kept across warm invocations. Limited-character expiries and
+    rate-boost start/end times split time into windows with a fixed distribution;
+    each window's alias table is compiled once, on first use, and switched to at the
+    boundary without re-querying the catalog or parsing event configs. The current
+    window is one tuple swapped in a single assignment, so a draw running alongside a
+    switch on another thread never mixes two windows' tables.
+    """
+    
+    def __init__(self, rows: List[tuple], now: datetime, boosts: Optional[List[tuple]] = None,
+                 version: Optional[int] = None):
+        self.rows = rows
+        self.boosts = boosts or []
+        self.version = version  # catalog_version the rows were read at
+        self.breakpoints = sorted(
+            {row[5] for row in rows if row[4] and row[5]}
+            | {boost[1] for boost in self.boosts}
+            | {boost[2] for boost in self.boosts}
+        )
+        self.windows: Dict[int, Tuple[List[tuple], List[float], List[int], List[int]]] = {}
+        # Pre-encoded character JSON by id, valid for this pool's catalog version
+        self.fragments: Dict[int, str] = {}
+        self.compile(now)
+    
+    def compile_window(self, now: datetime) -> Tuple[List[tuple], List[float], List[int], List[int]]:
+        characters = [row for row in self.rows if not row[4] or (row[5] and row[5] > now)]
+        active = [boost for boost in self.boosts if boost[1] <= now < boost[2]]
+        
+        weights = []
+        for row in characters:
+            weight = float(row[8])  # row[8] is chance
+            for _, _, _, rarity_multipliers, character_multipliers in active:
+                weight *= rarity_multipliers.get(row[6], 1.0) * character_multipliers.get(row[0], 1.0)
+            weights.append(weight)
+        
+        prob, alias = build_alias_table(weights)
+        return characters, prob, alias, [boost[0] for boost in active]
+    
+    def compile(self, now: datetime) -> None:
+        window = bisect.bisect_right(self.breakpoints, now)
+        if window not in self.windows:
+            self.windows[window] = self.compile_window(now)
+        # Swapped before next_breakpoint moves, so a concurrent refresh() at worst compiles twice
+        self.window = self.windows[window]
+        self.next_breakpoint = self.breakpoints[window] if window < len(self.breakpoints) else None
+    
+    @property
+    def characters(self) -> List[tuple]:
+        return self.window[0]
+    
+    @property
+    def prob(self) -> List[float]:
+        return self.window[1]
+    
+    @property
+    def alias(self) -> List[int]:
+        return self.window[2]
+    
+    @property
+    def active_event_ids(self) -> List[int]:
+        return self.window[3]
+    
+    def is_current(self, version: int) -> bool:
+        return self.version == version
+    
+    def refresh(self, now: datetime) -> None:
+        if self.next_breakpoint is not None and now >= self.next_breakpoint:
+            self.compile(now)
+    
+    def draw(self, rng: random.Random = random) -> tuple:
+        characters, prob, alias, _ = self.window
+        i = int(rng.random() * len(characters))
+        return characters[i] if rng.random() < prob[i] else characters[alias[i]]
+    
+    def fragment(self, row: tuple) -> str:
+        # Encoded on a character's first draw and reused until the catalog version moves
+        encoded = self.fragments.get(row[0])
+        if encoded is None:
+            encoded = self.fragments[row[0]] = json.dumps(character_to_dict(row))
+        return encoded
+
+
+_spin_pool: Optional[SpinPool] = None
+
+
+SPIN_QUESTS_QUERY = """
+    SELECT id, title, target_value, reward_type, reward_value
+    FROM daily_quests
+    WHERE quest_type = 'daily_spins' AND is_active = true
+    ORDER BY target_value, id
+"""
+
+# Daily quest progress, completion and free_spin rewards for one spin in one statement, driven
+# by the cached quest definitions instead of a daily_quests scan
+SPIN_QUEST_PROGRESS_QUERY = """
+    WITH progress AS (
+        INSERT INTO user_quest_progress AS p
+            (user_id, quest_id, current_progress, quest_date, completed, completed_at)
+        SELECT %(user_id)s, q.quest_id, %(count)s, CURRENT_DATE, %(count)s >= q.target_value,
+               CASE WHEN %(count)s >= q.target_value THEN %(now)s::timestamp END
+        FROM unnest(%(quest_ids)s::int[], %(targets)s::int[]) AS q(quest_id, target_value)
+        ON CONFLICT (user_id, quest_id, quest_date) DO UPDATE SET
+            current_progress = p.current_progress + EXCLUDED.current_progress,
+            completed = p.completed OR p.current_progress + EXCLUDED.current_progress
+                >= (%(targets)s::int[])[array_position(%(quest_ids)s::int[], p.quest_id)],
+            completed_at = COALESCE(p.completed_at, CASE
+                WHEN p.current_progress + EXCLUDED.current_progress
+                    >= (%(targets)s::int[])[array_position(%(quest_ids)s::int[], p.quest_id)]
+                THEN %(now)s::timestamp END)
+        RETURNING p.quest_id, p.current_progress, p.completed, p.completed_at
+    ),
+    rewarded AS (
+        UPDATE users u
+        SET free_spins = u.free_spins + reward.total
+        FROM (
+            SELECT SUM(q.free_spins) AS total
+            FROM progress
+            JOIN unnest(%(quest_ids)s::int[], %(free_spin_rewards)s::int[]) AS q(quest_id, free_spins)
+                USING (quest_id)
+            WHERE progress.completed_at = %(now)s::timestamp
+        ) AS reward
+        WHERE u.id = %(user_id)s AND reward.total > 0
+        RETURNING u.free_spins
+    )
+    SELECT quest_id, current_progress, completed, COALESCE(completed_at = %(now)s::timestamp, false),
+           (SELECT free_spins FROM rewarded)
+    FROM progress
+"""
+
+_spin_quests: Optional[Tuple[int, List[tuple]]] = None
+
+
+def get_spin_quests(cur: Any, version: int) -> List[tuple]:
+    """
+    Business: Active daily_spins quest definitions, cached per container like the spin pool
+    Args: cur - open cursor, version - current catalog_version (daily_quests writes bump it)
+    Returns: (id, title, target_value, reward_type, reward_value) rows
+    """
+    global _spin_quests
+    
+    if _spin_quests is None or _spin_quests[0] != version:
+        cur.execute(SPIN_QUESTS_QUERY)
+        _spin_quests = (version, cur.fetchall())
+    
+    return _spin_quests[1]
+
+
+# user_id -> (next allowed spin, trusted until), least recently used first. Guarded by a
+# lock, since a threaded host can run several spins of one container at once
+_cooldown_cache: 'OrderedDict[int, Tuple[datetime, datetime]]' = OrderedDict()
+_cooldown_lock = threading.Lock()
+
+
+def remember_cooldown(user_id: int, next_spin: datetime, now: datetime) -> None:
+    """
+    Business: Record that a user cannot spin before next_spin; only call it when they have no free spins
+    Args: user_id - spinning user, next_spin - next allowed spin (UTC), now - current UTC time
+    Returns: None
+    """
+    with _cooldown_lock:
+        if next_spin <= now:
+            _cooldown_cache.pop(user_id, None)
+            return
+        
+        _cooldown_cache[user_id] = (next_spin, min(next_spin, now + timedelta(seconds=COOLDOWN_CACHE_TTL_SECONDS)))
+        _cooldown_cache.move_to_end(user_id)
+        
+        if len(_cooldown_cache) > COOLDOWN_CACHE_SIZE:
+            _cooldown_cache.popitem(last=False)
+
+
+def forget_cooldown(user_id: int) -> None:
+    with _cooldown_lock:
+        _cooldown_cache.pop(user_id, None)
+
+
+def cached_cooldown(user_id: int, now: datetime) -> Optional[datetime]:
+    """
+    Business: Look up the in-memory cooldown gate; the database still decides every grant
+    Args: user_id - spinning user, now - current UTC time
+    Returns: Next allowed spin if the user is known to be cooling down, else None
+    """
+    with _cooldown_lock:
+        entry = _cooldown_cache.get(user_id)
+        if entry is None:
+            return None
+        
+        next_spin, trusted_until = entry
+        if now >= trusted_until:
+            del _cooldown_cache[user_id]
+            return None
+        
+        _cooldown_cache.move_to_end(user_id)
+        return next_spin
+
+
+def cooldown_response(now: datetime, next_spin: datetime) -> Dict[str, Any]:
+    return {
+        'statusCode': 429,
+        'headers': CORS_HEADERS,
+        'body': json.dumps({
+            'error': 'Spin cooldown active',
+            'remaining_minutes': int((next_spin - now).total_seconds() / 60),
+            'next_spin_available': next_spin.isoformat()
+        })
+    }
+
+
+def insufficient_spins_response(now: datetime, count: int, available: int, next_spin: datetime) -> Dict[str, Any]:
+    return {
+        'statusCode': 429,
+        'headers': CORS_HEADERS,
+        'body': json.dumps({
+            'error': f'Not enough spins for {count} pulls',
+            'available_spins': available,
+            'remaining_minutes': max(0, int((next_spin - now).total_seconds() / 60)),
+            'next_spin_available': next_spin.isoformat()
+        })
+    }
+
+
+def character_to_dict(row: tuple) -> Dict[str, Any]:
+    char_id, char_name, char_desc, char_image, is_limited, limited_until, rarity_name, rarity_color, chance = row
+    return {
+        'id': char_id,
+        'name': char_name,
+        'description': char_desc,
+        'image_url': char_image,
+        'is_limited': is_limited,
+        'limited_until': limited_until.isoformat() if limited_until else None,
+        'rarity': {
+            'name': rarity_name,
+            'color': rarity_color,
+            'chance': float(chance)
+        }
+    }
+
+
+def spin_response_body(pool: SpinPool, selected_characters: List[tuple], total_spins: int,
+                       free_spins: int, next_spin: datetime, quests: List[Dict[str, Any]]) -> str:
+    """
+    Business: Assemble the successful spin body from the pool's cached character fragments
+    Args: pool - current SpinPool, selected_characters - drawn rows, then the per-request fields
+    Returns: JSON text, byte for byte what json.dumps gives for the same response dict
+    """
+    characters = [pool.fragment(row) for row in selected_characters]
+    return (
+        f'{{"success": true, "character": {characters[0]}, "characters": [{", ".join(characters)}], '
+        f'"total_spins": {json.dumps(total_spins)}, "free_spins": {json.dumps(free_spins)}, '
+        f'"next_spin_available": {json.dumps(next_spin.isoformat())}, "quests": {json.dumps(quests)}}}'
+    )
+
+
+def get_spin_pool(cur: Any, now: datetime, version: int) -> SpinPool:
+    """
+    Business: Return the warm container's spin pool, reloading the catalog only when catalog_version moved
+    Args: cur - open cursor, now - current UTC time, version - current catalog_version
+    Returns: SpinPool ready for draws at 'now'
+    """
+    global _spin_pool
+    
+    if _spin_pool is None or not _spin_pool.is_current(version):
+        cur.execute(SPIN_POOL_QUERY, (now,))
+        rows = cur.fetchall()
+        cur.execute(SPIN_EVENTS_QUERY, (now,))
+        _spin_pool = SpinPool(rows, now, compile_rate_boosts(cur.fetchall()), version)
+    else:
+        _spin_pool.refresh(now)
+    
+    return _spin_pool
+
+
+PREFLIGHT_RESPONSE = preflight_response('POST, OPTIONS')
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Business: Character spinning/gacha system with cooldown and rarity mechanics
-    Args: event with httpMethod, headers containing Authorization token
-    Returns: Spin result with character obtained or cooldown error
+    Args: event with httpMethod, headers containing Authorization token, optional body {"count": N}
+    Returns: Spin result with character(s) obtained, or 429 when the user cannot pay for N pulls
     """
+    return run(event, context, 'spin', PREFLIGHT_RESPONSE, handle_request)
+
+
+def handle_request(event: Dict[str, Any], context: Any, timer: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'GET')
     
-    # Handle CORS OPTIONS request
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
     if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'})
-        }
+        return error_response(405, 'Method not allowed')
     
     try:
         # Get and verify JWT token
-        headers = event.get('headers', {})
-        auth_header = headers.get('authorization') or headers.get('Authorization')
+        payload, error = authenticate(event)
+        if error:
+            return error
+        user_id = payload.get('user_id')
+        username = payload.get('username')
         
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return {
-                'statusCode': 401,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'No valid authorization token provided'})
-            }
+        timer.lap('jwt')
         
-        token = auth_header[7:]  # Remove 'Bearer ' prefix
-        jwt_secret = 'rng_game_secret_key_2024'
+        # Optional multi-pull: {"count": N} draws N characters in one transaction
+        body_data = json.loads(event.get('body') or '{}')
+        if not isinstance(body_data, dict):
+            return error_response(400, 'Request body must be a JSON object')
+        count = body_data.get('count', 1)
         
-        try:
-            payload = jwt.decode(token, jwt_secret, algorithms=['HS256'])
-            user_id = payload.get('user_id')
-            username = payload.get('username')
-        except jwt.InvalidTokenError:
-            return {
-                'statusCode': 401,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Invalid or expired token'})
-            }
+        if not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > MAX_SPINS_PER_REQUEST:
+            return error_response(400, f'count must be an integer between 1 and {MAX_SPINS_PER_REQUEST}')
+        
+        # Early spins inside a known cooldown never reach the database
+        now = datetime.utcnow()
+        next_spin = cached_cooldown(user_id, now)
+        if next_spin is not None:
+            return cooldown_response(now, next_spin)
         
         database_url = os.environ.get('DATABASE_URL')
         if not database_url:
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Database connection not configured'})
-            }
+            return error_response(500, 'Database connection not configured')
         
-        with psycopg.connect(database_url) as conn:
+        with get_db_pool(database_url).connection() as conn:
             with conn.cursor() as cur:
-                # Check user's last spin time (1 hour cooldown)
-                cur.execute("SELECT last_spin, total_spins FROM users WHERE id = %s", (user_id,))
+                timer.lap('db_connect')
+                
+                # Check and pay for the pulls; see SPIN_CLAIM_QUERY
+                cur.execute(SPIN_CLAIM_QUERY, {
+                    'now': now, 'cooled_down_at': now - SPIN_COOLDOWN, 'count': count, 'user_id': user_id
+                })
                 result = cur.fetchone()
+                timer.lap('cooldown')
                 
                 if not result:
-                    return {
-                        'statusCode': 404,
-                        'headers': {'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'User not found'})
-                    }
-                
-                last_spin, total_spins = result[0], result[1] or 0
-                now = datetime.utcnow()
+                    return error_response(404, 'User not found')
                 
-                # Check cooldown (1 hour = 3600 seconds)
-                if last_spin:
-                    time_diff = now - last_spin
-                    if time_diff < timedelta(hours=1):
-                        remaining = timedelta(hours=1) - time_diff
-                        remaining_minutes = int(remaining.total_seconds() / 60)
-                        return {
-                            'statusCode': 429,
-                            'headers': {'Access-Control-Allow-Origin': '*'},
-                            'body': json.dumps({
-                                'error': 'Spin cooldown active',
-                                'remaining_minutes': remaining_minutes,
-                                'next_spin_available': (now + remaining).isoformat()
-                            })
-                        }
+                total_spins, last_spin, claimed_last_spin, free_spins, catalog_version = result
                 
-                # Get all active characters with rarities
-                cur.execute("""
-                    SELECT c.id, c.name, c.description, c.image_url, c.is_limited, c.limited_until,
-                           r.name as rarity_name, r.color as rarity_color, r.chance
-                    FROM characters c
-                    JOIN rarities r ON c.rarity_id = r.id
-                    WHERE c.is_active = true 
-                    AND (c.is_limited = false OR c.limited_until > %s)
-                    ORDER BY r.chance DESC
-                """, (now,))
+                if total_spins is None:
+                    cooled_down = not last_spin or now - last_spin >= SPIN_COOLDOWN
+                    available = free_spins + (1 if cooled_down else 0)
+                    if 0 < available < count:
+                        # Enough for a smaller batch only; nothing was spent
+                        return insufficient_spins_response(
+                            now, count, available, now if cooled_down else last_spin + SPIN_COOLDOWN
+                        )
+                    # Nothing left to spend, or a concurrent spin claimed it after our snapshot was taken
+                    if cooled_down:
+                        last_spin = now
+                    if not free_spins:
+                        remember_cooldown(user_id, last_spin + SPIN_COOLDOWN, now)
+                    return cooldown_response(now, last_spin + SPIN_COOLDOWN)
                 
-                characters = cur.fetchall()
+                # Get the compiled pool of active characters with rarities
+                pool = get_spin_pool(cur, now, catalog_version)
+                quests = get_spin_quests(cur, catalog_version)
+                timer.lap('catalog')
                 
-                if not characters:
-                    return {
-                        'statusCode': 404,
-                        'headers': {'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'No characters available for spinning'})
-                    }
+                if not pool.characters:
+                    # Give the cooldown claim back
+                    conn.rollback()
+                    return error_response(404, 'No characters available for spinning')
                 
                 # Perform weighted random selection based on rarity chances
-                total_weight = sum(char[8] for char in characters)  # char[8] is chance
-                random_value = random.random() * total_weight
+                selected_characters = [pool.draw() for _ in range(count)]
+                timer.lap('select')
                 
-                current_weight = 0
-                selected_character = None
-                
-                for char in characters:
-                    current_weight += char[8]  # char[8] is chance
-                    if random_value <= current_weight:
-                        selected_character = char
-                        break
-                
-                if not selected_character:
-                    selected_character = characters[-1]  # Fallback to last character
-                
-                char_id, char_name, char_desc, char_image, is_limited, limited_until, rarity_name, rarity_color, chance = selected_character
-                
-                # Add character to user's collection
-                cur.execute("""
-                    INSERT INTO user_characters (user_id, character_id)
-                    VALUES (%s, %s)
-                """, (user_id, char_id))
+                # None of the writes waits on another's result, so in pipeline mode they and the
+                # COMMIT reach Postgres in one flush when the block exits
+                with conn.pipeline() if SPIN_PIPELINE_WRITES else nullcontext():
+                    # Record the pulls and roll them up; see SPIN_WRITE_QUERY
+                    cur.execute(SPIN_WRITE_QUERY, {
+                        'user_id': user_id,
+                        'now': now,
+                        'count': count,
+                        'character_ids': [char[0] for char in selected_characters]
+                    })
+                    
+                    # Update daily quest progress; see SPIN_QUEST_PROGRESS_QUERY. It gets its own
+                    # cursor, since in pipeline mode cur only keeps the last result it was sent
+                    quest_cur = None
+                    if quests:
+                        quest_cur = conn.execute(SPIN_QUEST_PROGRESS_QUERY, {
+                            'user_id': user_id,
+                            'count': count,
+                            'now': now,
+                            'quest_ids': [quest[0] for quest in quests],
+                            'targets': [quest[2] for quest in quests],
+                            'free_spin_rewards': [quest[4] if quest[3] == 'free_spin' else 0 for quest in quests]
+                        })
+                    # A queued COMMIT statement: conn.commit() would sync the pipeline by itself and
+                    # leave the block's exit to pay a second round trip
+                    cur.execute("COMMIT")
                 
-                # Update user's spin count and last spin time
-                cur.execute("""
-                    UPDATE users 
-                    SET last_spin = %s, total_spins = %s
-                    WHERE id = %s
-                """, (now, total_spins + 1, user_id))
+                quest_state = {}
+                for quest_id, progress, completed, just_completed, rewarded_free_spins in (quest_cur.fetchall() if quest_cur else []):
+                    quest_state[quest_id] = (progress, completed, just_completed)
+                    if rewarded_free_spins is not None:
+                        free_spins = rewarded_free_spins
+                timer.lap('write')
                 
-                # Update daily quest progress for spins
-                cur.execute("""
-                    INSERT INTO user_quest_progress (user_id, quest_id, current_progress, quest_date)
-                    SELECT %s, dq.id, 1, CURRENT_DATE
-                    FROM daily_quests dq
-                    WHERE dq.quest_type = 'daily_spins' AND dq.is_active = true
-                    ON CONFLICT (user_id, quest_id, quest_date)
-                    DO UPDATE SET current_progress = user_quest_progress.current_progress + 1
-                """, (user_id,))
+                # Gate the next early spin in memory, unless quest rewards left free spins to spend
+                next_spin = claimed_last_spin + SPIN_COOLDOWN
+                if free_spins:
+                    forget_cooldown(user_id)
+                else:
+                    remember_cooldown(user_id, next_spin, now)
                 
                 return {
                     'statusCode': 200,
-                    'headers': {
-                        'Access-Control-Allow-Origin': '*',
-                        'Content-Type': 'application/json'
-                    },
-                    'body': json.dumps({
-                        'success': True,
-                        'character': {
-                            'id': char_id,
-                            'name': char_name,
-                            'description': char_desc,
-                            'image_url': char_image,
-                            'is_limited': is_limited,
-                            'limited_until': limited_until.isoformat() if limited_until else None,
-                            'rarity': {
-                                'name': rarity_name,
-                                'color': rarity_color,
-                                'chance': float(chance)
-                            }
-                        },
-                        'total_spins': total_spins + 1,
-                        'next_spin_available': (now + timedelta(hours=1)).isoformat()
-                    })
+                    'headers': JSON_HEADERS,
+                    'body': spin_response_body(pool, selected_characters, total_spins, free_spins, next_spin, [
+                        {
+                            'id': quest_id,
+                            'title': title,
+                            'progress': quest_state.get(quest_id, (0, False, False))[0],
+                            'target': target_value,
+                            'completed': quest_state.get(quest_id, (0, False, False))[1],
+                            'just_completed': quest_state.get(quest_id, (0, False, False))[2],
+                            'reward': {'type': reward_type, 'value': reward_value}
+                        } for quest_id, title, target_value, reward_type, reward_value in quests
+                    ])
                 }
                 
+    except json.JSONDecodeError:
+        return error_response(400, 'Invalid JSON in request body')
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Server error: {str(e)}'})
-        }
\ No newline at end of file
+        return error_response(500, f'Server error: {str(e)}')
\ No newline at end of file
@@ -0,0 +1,18 @@
+-- Per-user collection rollup maintained by the spin transaction
+-- user_characters stays the append-only pull log; this table answers "my collection" reads
+CREATE TABLE user_collection (
+    user_id INTEGER REFERENCES users(id),
+    character_id INTEGER REFERENCES characters(id),
+    count INTEGER NOT NULL DEFAULT 0,
+    first_obtained TIMESTAMP NOT NULL,
+    last_obtained TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, character_id) -- also serves keyset pagination by character_id
+);
+
+-- Backfill from existing pulls
+INSERT INTO user_collection (user_id, character_id, count, first_obtained, last_obtained)
+SELECT user_id, character_id, COUNT(*), MIN(obtained_at), MAX(obtained_at)
+FROM user_characters
+WHERE user_id IS NOT NULL AND character_id IS NOT NULL
+GROUP BY user_id, character_id
+ON CONFLICT (user_id, character_id) DO NOTHING;
@@ -0,0 +1,25 @@
+-- Catalog version: a single row bumped by every write to characters or rarities
+-- Lets readers (admin listing ETags, warm spin workers) detect catalog changes with one PK lookup
+CREATE TABLE catalog_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO catalog_version (id, version) VALUES (1, 1);
+
+CREATE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement level, so a bulk COPY bumps the version once
+CREATE TRIGGER characters_bump_catalog_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON characters
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER rarities_bump_catalog_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON rarities
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
@@ -0,0 +1,20 @@
+-- Secondary indexes for the hot query paths
+
+-- The spin pool query reads most of characters and is planned as a sequential scan,
+-- so it gets no index of its own
+
+-- Admin listing: keyset pagination on (created_at, id), optionally filtered by rarity
+CREATE INDEX IF NOT EXISTS idx_characters_created_at_id
+    ON characters (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_characters_rarity_created_at_id
+    ON characters (rarity_id, created_at DESC, id DESC);
+
+-- Quest progress upsert: active quests of a type, covering the id it selects
+CREATE INDEX IF NOT EXISTS idx_daily_quests_active_type
+    ON daily_quests (quest_type) INCLUDE (id)
+    WHERE is_active = true;
+
+-- Foreign key lookups from daily_quests into progress rows
+CREATE INDEX IF NOT EXISTS idx_user_quest_progress_quest_id
+    ON user_quest_progress (quest_id);
@@ -0,0 +1,2 @@
+-- Free spins granted by completed quests (reward_type = 'free_spin'); each one skips the spin cooldown once
+ALTER TABLE users ADD COLUMN free_spins INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,55 @@
+-- Drop statistics rollups maintained by the spin transaction
+-- Admin stats read only these tables, never the user_characters pull log
+
+-- Drops per character per hour; rarity_id is the character's rarity at drop time
+CREATE TABLE drop_stats_hourly (
+    hour TIMESTAMP NOT NULL,
+    character_id INTEGER REFERENCES characters(id),
+    rarity_id INTEGER REFERENCES rarities(id),
+    drops INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, character_id) -- also serves time-range scans
+);
+
+-- Drops per rarity per hour, so rarity rates and time series read one row per rarity and
+-- hour instead of re-aggregating every character row of the window
+CREATE TABLE drop_stats_rarity_hourly (
+    hour TIMESTAMP NOT NULL,
+    rarity_id INTEGER REFERENCES rarities(id),
+    drops INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, rarity_id)
+);
+
+-- Per-user totals for the collector leaderboards
+CREATE TABLE collector_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id),
+    pulls INTEGER NOT NULL DEFAULT 0,
+    unique_characters INTEGER NOT NULL DEFAULT 0,
+    last_pull TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_collector_stats_unique_characters
+    ON collector_stats (unique_characters DESC, pulls DESC);
+
+CREATE INDEX idx_collector_stats_pulls
+    ON collector_stats (pulls DESC);
+
+-- Backfill from existing pulls
+INSERT INTO drop_stats_hourly (hour, character_id, rarity_id, drops)
+SELECT date_trunc('hour', uc.obtained_at), uc.character_id, c.rarity_id, COUNT(*)
+FROM user_characters uc
+JOIN characters c ON c.id = uc.character_id
+WHERE uc.obtained_at IS NOT NULL
+GROUP BY 1, 2, 3
+ON CONFLICT (hour, character_id) DO NOTHING;
+
+INSERT INTO drop_stats_rarity_hourly (hour, rarity_id, drops)
+SELECT hour, rarity_id, SUM(drops)
+FROM drop_stats_hourly
+GROUP BY hour, rarity_id
+ON CONFLICT (hour, rarity_id) DO NOTHING;
+
+INSERT INTO collector_stats (user_id, pulls, unique_characters, last_pull)
+SELECT user_id, SUM(count), COUNT(*), MAX(last_obtained)
+FROM user_collection
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
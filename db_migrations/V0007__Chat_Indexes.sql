@@ -0,0 +1,3 @@
+-- Chat: reads page by id (primary key); retention trims by created_at
+CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at
+    ON chat_messages (created_at);
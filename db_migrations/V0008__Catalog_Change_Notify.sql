@@ -0,0 +1,21 @@
+-- Catalog change notifications: every catalog_version bump also sends NOTIFY catalog_changed
+-- with the new version, for long-lived listeners; warm spin workers compare the version instead
+CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1
+    RETURNING version INTO new_version;
+    PERFORM pg_notify('catalog_changed', new_version::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- rate_boost events and daily_spins quests are compiled into the warm spin pool too
+CREATE TRIGGER events_bump_catalog_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON events
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER daily_quests_bump_catalog_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON daily_quests
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
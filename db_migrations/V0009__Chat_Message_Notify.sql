@@ -0,0 +1,12 @@
+-- Chat long poll: every new message sends NOTIFY chat_message with its id on commit, so
+-- waiting fetches wake up on the post instead of re-querying on a timer
+CREATE OR REPLACE FUNCTION notify_chat_message() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('chat_message', NEW.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER chat_messages_notify
+AFTER INSERT ON chat_messages
+FOR EACH ROW EXECUTE FUNCTION notify_chat_message();
@@ -0,0 +1,132 @@
+"""
+Business: Register/login burst benchmark for the auth function against a local Postgres
+Args: --admin-url, --concurrency, --seconds per burst, --rounds (BCRYPT_ROUNDS), --bcrypt-workers, --compare REV
+Returns: Prints sustained registrations and logins per second with latency percentiles, and a signup race check
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType, SimpleNamespace
+from typing import List, Tuple
+
+from bench_startup import checkout_backend
+from loadtest import percentile, prepare
+from local_functions import BACKEND_DIR, import_index
+
+PASSWORD = 'bench_password'
+
+
+def load_auth(backend_dir: str, label: str) -> ModuleType:
+    return import_index(os.path.join(backend_dir, 'auth'), f'bench_auth_{label}')
+
+
+def call(auth: ModuleType, action: str, username: str) -> int:
+    event = {
+        'httpMethod': 'POST',
+        'headers': {},
+        'body': json.dumps({'action': action, 'username': username, 'password': PASSWORD})
+    }
+    return auth.handler(event, SimpleNamespace(request_id=f'bench-{action}'))['statusCode']
+
+
+def burst(auth: ModuleType, action: str, usernames: List[str], concurrency: int, seconds: float) -> Tuple[float, List[float], Counter]:
+    """
+    Business: Keep `concurrency` clients calling the action back to back for `seconds`
+    Args: auth module, action, usernames used round-robin (each must be new for register), client count, duration
+    Returns: (requests per second, latencies in ms, status counts)
+    """
+    names = iter(usernames)
+    lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+
+    def client() -> None:
+        while time.perf_counter() < deadline:
+            with lock:
+                username = next(names, None)
+            if username is None:
+                return
+            started = time.perf_counter()
+            status = call(auth, action, username)
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    return len(latencies) / (time.perf_counter() - started), latencies, statuses
+
+
+def signup_race(auth: ModuleType, username: str, concurrency: int) -> Counter:
+    # Every client registers the same name at once; exactly one may succeed
+    barrier = threading.Barrier(concurrency)
+
+    def client() -> int:
+        barrier.wait()
+        return call(auth, 'register', username)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return Counter(executor.map(lambda _: client(), range(concurrency)))
+
+
+def run(label: str, auth: ModuleType, prefix: str, concurrency: int, seconds: float) -> None:
+    # More names than a burst can use, so clients never run dry before the deadline
+    names = [f'{prefix}_{n}' for n in range(100000)]
+
+    print(f"\n{label}")
+    registered = 0
+    for action in ('register', 'login'):
+        if action == 'login' and not registered:
+            print("  login     skipped: no registration succeeded")
+            break
+        usernames = names if action == 'register' else [names[n % registered] for n in range(100000)]
+        rate, latencies, statuses = burst(auth, action, usernames, concurrency, seconds)
+        if action == 'register':
+            registered = statuses.get(200, 0)
+        print(
+            f"  {action:<10}{rate:>8.1f}/s  p50={percentile(latencies, 50):8.1f}ms  "
+            f"p95={percentile(latencies, 95):8.1f}ms  statuses {dict(statuses)}"
+        )
+
+    race = signup_race(auth, f'{prefix}_race', concurrency)
+    print(f"  signup race: {concurrency} concurrent registrations of one name -> {dict(race)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--admin-url', default=os.environ.get('LOADTEST_ADMIN_URL', 'postgresql://postgres@localhost/postgres'))
+    parser.add_argument('--database', default='rng_auth_bench', help='scratch database, dropped and recreated')
+    parser.add_argument('--concurrency', type=int, default=16, help='clients calling back to back')
+    parser.add_argument('--seconds', type=float, default=10.0, help='duration of each burst')
+    parser.add_argument('--rounds', type=int, default=None, help='BCRYPT_ROUNDS for the working tree (default: its own)')
+    parser.add_argument('--bcrypt-workers', type=int, default=None, help='BCRYPT_WORKERS (default: CPU count)')
+    parser.add_argument('--compare', default=None, help='git revision to benchmark alongside the working tree')
+    args = parser.parse_args()
+
+    prepare(args.admin_url, args.database, 1, 'auth_bench_secret')
+    if args.rounds is not None:
+        os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    if args.bcrypt_workers is not None:
+        os.environ['BCRYPT_WORKERS'] = str(args.bcrypt_workers)
+    os.environ['TIMING_SAMPLE_RATE'] = '0'
+
+    print(
+        f"{args.concurrency} clients, {args.seconds:.0f}s per burst, "
+        f"DB pool max {os.environ.get('DB_POOL_MAX_SIZE', 'default')}, {os.cpu_count()} CPUs"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.compare:
+            run(args.compare, load_auth(checkout_backend(args.compare, tmp), 'compare'), 'bench_compare', args.concurrency, args.seconds)
+        run('working tree', load_auth(BACKEND_DIR, 'working'), 'bench_working', args.concurrency, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
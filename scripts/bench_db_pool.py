@@ -0,0 +1,84 @@
+"""
+Business: Benchmark per-request database latency with and without the warm connection pool
+Args: --database-url (or DATABASE_URL) pointing at a local Postgres, --requests, --pool-size
+Returns: Prints mean/p50/p95/p99 latency in milliseconds for both modes
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Callable, List
+
+import psycopg
+from psycopg_pool import ConnectionPool
+
+# Same shape as the login lookup in backend/auth: one indexed read per request
+REQUEST_QUERY = "SELECT id, password_hash, is_admin FROM users WHERE username = %s"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(run_request: Callable[[], None], requests: int) -> List[float]:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        run_request()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: List[float]) -> None:
+    print(
+        f"{label:<12} mean={statistics.mean(samples):7.3f}ms "
+        f"p50={percentile(samples, 50):7.3f}ms "
+        f"p95={percentile(samples, 95):7.3f}ms "
+        f"p99={percentile(samples, 99):7.3f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error('DATABASE_URL is not set')
+
+    def connect_per_request() -> None:
+        # What every handler did before: a fresh TCP+auth handshake per request
+        with psycopg.connect(args.database_url) as conn:
+            conn.execute(REQUEST_QUERY, ('Admin',)).fetchone()
+
+    pool = ConnectionPool(
+        args.database_url,
+        min_size=1,
+        max_size=args.pool_size,
+        check=ConnectionPool.check_connection,
+        open=True
+    )
+    pool.wait()
+
+    def pooled() -> None:
+        with pool.connection() as conn:
+            conn.execute(REQUEST_QUERY, ('Admin',)).fetchone()
+
+    try:
+        # Warm up both paths so the first handshake is not counted
+        connect_per_request()
+        pooled()
+
+        print(f"{args.requests} sequential requests")
+        report('no pool', measure(connect_per_request, args.requests))
+        report('pooled', measure(pooled, args.requests))
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Business: Microbenchmark of response serialization: per-request json.dumps vs cached catalog fragments
+Args: --characters in the synthetic catalog, --page admin listing size, --spins per pull, --runs
+Returns: Prints microseconds per spin body and per admin listing page for both paths; exits 1 if the bytes differ
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from local_functions import load_function
+from simulate_drop_rates import DEFAULT_FIXTURE, load_fixture, spin_pool_rows
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+def synthetic_catalog(size: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # The fixture's characters repeated under new ids, with descriptions and limited dates filled in
+    rarities, templates, _ = load_fixture(DEFAULT_FIXTURE)
+    characters = []
+    for n in range(size):
+        template = templates[n % len(templates)]
+        characters.append(dict(
+            template,
+            id=n + 1,
+            name=f"{template['name']} {n + 1}",
+            description=template['description'] or f"Synthetic character number {n + 1}",
+            image_url=template['image_url'] or f"https://cdn.example.com/characters/{n + 1}.png",
+            is_limited=n % 20 == 0,
+            limited_until=NOW + timedelta(days=30) if n % 20 == 0 else None
+        ))
+    return rarities, characters
+
+
+def per_call_us(fn: Callable[[], Any], runs: int) -> float:
+    # Best of five repeats, so a scheduler hiccup does not inflate the figure
+    return min(timeit.repeat(fn, number=runs, repeat=5)) / runs * 1e6
+
+
+def bench_spin(rarities: List[Dict[str, Any]], characters: List[Dict[str, Any]], pulls: int, runs: int) -> Tuple[float, float, bool]:
+    spin = load_function('spin')
+    pool = spin.SpinPool(spin_pool_rows(rarities, characters), NOW, version=1)
+    selected = [pool.draw() for _ in range(pulls)]
+    quests = [{'id': 1, 'title': 'Spin 5 times', 'progress': 3, 'target': 5, 'completed': False,
+               'just_completed': False, 'reward': {'type': 'free_spin', 'value': 1}}]
+    next_spin = NOW + timedelta(hours=1)
+
+    def dumps_body() -> str:
+        # What the handler did before: fresh dicts and one json.dumps per spin
+        results = [spin.character_to_dict(row) for row in selected]
+        return json.dumps({
+            'success': True,
+            'character': results[0],
+            'characters': results,
+            'total_spins': 42,
+            'free_spins': 0,
+            'next_spin_available': next_spin.isoformat(),
+            'quests': quests
+        })
+
+    def fragment_body() -> str:
+        return spin.spin_response_body(pool, selected, 42, 0, next_spin, quests)
+
+    # Warm the fragments like a container that has served this pool before
+    fragment_body()
+    return per_call_us(dumps_body, runs), per_call_us(fragment_body, runs), dumps_body() == fragment_body()
+
+
+def bench_listing(rarities: List[Dict[str, Any]], characters: List[Dict[str, Any]], page: int, runs: int) -> Tuple[float, float, bool]:
+    admin = load_function('admin')
+    by_id = {r['id']: r for r in rarities}
+    fields = list(admin.LISTING_COLUMNS)
+    # Row shape of the listing query with every field selected: created_at, id, then LISTING_COLUMNS
+    rows = [
+        (NOW - timedelta(minutes=c['id']), c['id'], c['id'], c['name'], c['description'], c['image_url'],
+         c['is_limited'], c['limited_until'], c['is_active'], by_id[c['rarity_id']]['name'], by_id[c['rarity_id']]['color'])
+        for c in characters[:page]
+    ]
+    next_cursor = f"{rows[-1][0].isoformat()},{rows[-1][1]}"
+    rarity_rows = [(r['id'], r['name'], r['color'], r['chance']) for r in sorted(rarities, key=lambda r: -r['chance'])]
+
+    def dumps_body() -> str:
+        return json.dumps({
+            'characters': [admin.build_listing_item(fields, row[2:]) for row in rows],
+            'next_cursor': next_cursor,
+            'catalog_version': 1,
+            'rarities': [{'id': r[0], 'name': r[1], 'color': r[2], 'chance': float(r[3])} for r in rarity_rows]
+        })
+
+    fragments = admin.ListingFragments(1)
+    fragments.rarities = json.dumps([{'id': r[0], 'name': r[1], 'color': r[2], 'chance': float(r[3])} for r in rarity_rows])
+
+    def fragment_body() -> str:
+        return admin.listing_body(fragments, fields, rows, next_cursor, fragments.rarities)
+
+    fragment_body()
+    return per_call_us(dumps_body, runs), per_call_us(fragment_body, runs), dumps_body() == fragment_body()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--characters', type=int, default=2000, help='synthetic catalog size')
+    parser.add_argument('--page', type=int, default=100, help='admin listing page size')
+    parser.add_argument('--spins', type=int, nargs='*', default=[1, 10], help='pulls per spin request')
+    parser.add_argument('--runs', type=int, default=2000, help='calls per timing repeat')
+    args = parser.parse_args()
+
+    os.environ.setdefault('JWT_SECRET', 'bench_serialization')
+    rarities, characters = synthetic_catalog(args.characters)
+
+    results = [(f'spin x{pulls}', *bench_spin(rarities, characters, pulls, args.runs)) for pulls in args.spins]
+    results.append((f'admin listing ({args.page} items)', *bench_listing(rarities, characters, args.page, max(1, args.runs // 20))))
+
+    print(f"{'response':<28}{'json.dumps':>14}{'fragments':>14}{'speedup':>10}  bytes")
+    failures = 0
+    for label, dumps_us, fragment_us, identical in results:
+        print(
+            f"{label:<28}{dumps_us:>12.2f}us{fragment_us:>12.2f}us{dumps_us / fragment_us:>9.1f}x  "
+            f"{'identical' if identical else 'DIFFER'}"
+        )
+        failures += not identical
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Business: Benchmark the spin write phase with and without psycopg pipeline mode over an injected network delay
+Args: --admin-url of a local Postgres server, --latency-ms one-way delay, --spins per mode
+Returns: Prints spin latency per mode and the round trips saved per spin
+"""
+import argparse
+import heapq
+import os
+import socket
+import statistics
+import threading
+import time
+from itertools import count
+from types import SimpleNamespace
+from typing import List, Tuple
+from urllib.parse import urlparse, urlunparse
+
+from loadtest import percentile, prepare
+from local_functions import load_function
+
+
+class DelayProxy:
+    """
+    TCP proxy that holds every chunk for a fixed one-way delay before forwarding it, so each
+    client/server round trip costs 2 x delay without limiting throughput.
+    """
+
+    def __init__(self, upstream: Tuple[str, int], delay: float):
+        self.upstream = upstream
+        self.delay = delay
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self) -> None:
+        while True:
+            client, _ = self.listener.accept()
+            server = socket.create_connection(self.upstream)
+            # Forward small chunks immediately, like libpq's own sockets; Nagle plus delayed ACKs
+            # would otherwise add ~40ms stalls that have nothing to do with the injected delay
+            for sock in (client, server):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            for source, target in ((client, server), (server, client)):
+                self.pump(source, target)
+
+    def pump(self, source: socket.socket, target: socket.socket) -> None:
+        pending: List[Tuple[float, int, bytes]] = []
+        ready = threading.Condition()
+        sequence = count()
+
+        def read() -> None:
+            while True:
+                try:
+                    chunk = source.recv(65536)
+                except OSError:
+                    chunk = b''
+                with ready:
+                    heapq.heappush(pending, (time.monotonic() + self.delay, next(sequence), chunk))
+                    ready.notify()
+                if not chunk:
+                    return
+
+        def write() -> None:
+            while True:
+                with ready:
+                    while not pending:
+                        ready.wait()
+                    due, _, chunk = pending[0]
+                    wait = due - time.monotonic()
+                    if wait > 0:
+                        ready.wait(wait)
+                        continue
+                    heapq.heappop(pending)
+                if not chunk:
+                    target.close()
+                    return
+                try:
+                    target.sendall(chunk)
+                except OSError:
+                    return
+
+        threading.Thread(target=read, daemon=True).start()
+        threading.Thread(target=write, daemon=True).start()
+
+
+def through_proxy(database_url: str, port: int) -> str:
+    parts = urlparse(database_url)
+    netloc = parts.netloc.rsplit('@', 1)
+    host = f'127.0.0.1:{port}'
+    return urlunparse(parts._replace(netloc=f'{netloc[0]}@{host}' if len(netloc) == 2 else host))
+
+
+def run_spins(spin, tokens: List[str], pipeline: bool) -> List[float]:
+    spin.SPIN_PIPELINE_WRITES = pipeline
+    samples = []
+    for n, token in enumerate(tokens):
+        event = {'httpMethod': 'POST', 'headers': {'Authorization': f'Bearer {token}'}, 'body': '{}'}
+        started = time.perf_counter()
+        response = spin.handler(event, SimpleNamespace(request_id=f'pipeline-{n}'))
+        samples.append((time.perf_counter() - started) * 1000)
+        if response['statusCode'] != 200:
+            raise SystemExit(f"spin returned {response['statusCode']}: {response['body']}")
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--admin-url', default=os.environ.get('LOADTEST_ADMIN_URL', 'postgresql://postgres@localhost/postgres'))
+    parser.add_argument('--database', default='rng_pipeline_bench', help='scratch database, dropped and recreated')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='one-way delay added to every packet')
+    parser.add_argument('--spins', type=int, default=50, help='spins per mode; each uses a fresh user')
+    args = parser.parse_args()
+
+    # Every spin needs a user off cooldown: one set per mode plus one to warm the container
+    user_tokens, _ = prepare(args.admin_url, args.database, 2 * args.spins + 1, 'pipeline_bench_secret')
+    parts = urlparse(os.environ['DATABASE_URL'])
+    proxy = DelayProxy((parts.hostname or 'localhost', parts.port or 5432), args.latency_ms / 1000)
+    os.environ['DATABASE_URL'] = through_proxy(os.environ['DATABASE_URL'], proxy.port)
+    os.environ['TIMING_SAMPLE_RATE'] = '0'
+
+    spin = load_function('spin')
+    # Warm up: pool connection, JWT cache miss and catalog load are not part of the write phase
+    run_spins(spin, user_tokens[:1], True)
+
+    round_trip = 2 * args.latency_ms
+    results = {}
+    for label, pipeline, tokens in (
+        ('sequential', False, user_tokens[1:args.spins + 1]),
+        ('pipeline', True, user_tokens[args.spins + 1:])
+    ):
+        samples = run_spins(spin, tokens, pipeline)
+        results[label] = statistics.median(samples)
+        print(
+            f"{label:<12} p50={percentile(samples, 50):8.2f}ms  p95={percentile(samples, 95):8.2f}ms  "
+            f"~{results[label] / round_trip:4.1f} round trips of {round_trip:.1f}ms"
+        )
+
+    saved = results['sequential'] - results['pipeline']
+    print(f"\npipeline saves {saved:.2f}ms per spin (~{saved / round_trip:.1f} round trips)")
+
+
+if __name__ == '__main__':
+    main()
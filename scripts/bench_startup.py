@@ -0,0 +1,108 @@
+"""
+Business: Cold-start benchmark: module import, CORS preflight and first request time per backend function
+Args: --functions, --runs, --compare REV (also measure the backend/ tree of a git revision, e.g. HEAD~1)
+Returns: Prints median milliseconds per phase and which heavy modules a preflight pulled in
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from local_functions import REPO_DIR, BACKEND_DIR, function_names
+
+HEAVY_MODULES = ('psycopg', 'psycopg_pool', 'jwt', 'bcrypt')
+
+# Runs in a fresh interpreter per sample, so every import is cold. The first request is
+# rejected before any database work (bad token, or an empty auth body), which keeps the
+# benchmark independent of Postgres while still exercising routing and token checks
+PROBE = r'''
+import json, os, sys, time
+os.environ.setdefault('JWT_SECRET', 'bench_startup')
+sys.path.insert(0, sys.argv[1])
+started = time.perf_counter()
+import index
+imported = time.perf_counter()
+index.handler({'httpMethod': 'OPTIONS', 'headers': {}}, None)
+preflight = time.perf_counter()
+heavy = sorted(name for name in sys.argv[3].split(',') if name in sys.modules)
+index.handler({'httpMethod': sys.argv[2], 'headers': {'Authorization': 'Bearer invalid'}, 'body': '{}'}, None)
+first = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'preflight_ms': (preflight - imported) * 1000,
+    'first_request_ms': (first - preflight) * 1000,
+    'heavy_after_preflight': heavy
+}))
+'''
+
+
+def first_method(backend_dir: str, function: str) -> str:
+    path = os.path.join(backend_dir, function, 'tests.json')
+    if not os.path.exists(path):
+        return 'GET'
+    with open(path) as f:
+        tests = json.load(f)['tests']
+    return tests[0].get('method', 'GET') if tests else 'GET'
+
+
+def measure(backend_dir: str, function: str, runs: int) -> Dict[str, object]:
+    samples: List[Dict[str, object]] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE, os.path.join(backend_dir, function),
+             first_method(backend_dir, function), ','.join(HEAVY_MODULES)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        # Handlers may log to stdout; the probe's result is the last line
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    result: Dict[str, object] = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ('import_ms', 'preflight_ms', 'first_request_ms')
+    }
+    result['heavy_after_preflight'] = samples[-1]['heavy_after_preflight']
+    return result
+
+
+def checkout_backend(rev: str, target: str) -> str:
+    archive = subprocess.run(['git', 'archive', rev, 'backend'], cwd=REPO_DIR, check=True, capture_output=True).stdout
+    subprocess.run(['tar', '-x', '-C', target], input=archive, check=True)
+    return os.path.join(target, 'backend')
+
+
+def report(label: str, results: Dict[str, Dict[str, object]]) -> None:
+    print(f"\n{label}")
+    print(f"{'function':<14}{'import':>10}{'preflight':>11}{'first req':>11}  heavy modules after OPTIONS")
+    for function, result in results.items():
+        print(
+            f"{function:<14}{result['import_ms']:>10.2f}{result['preflight_ms']:>11.3f}"
+            f"{result['first_request_ms']:>11.2f}  {', '.join(result['heavy_after_preflight']) or '-'}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--functions', nargs='*', default=None, help='default: every backend function')
+    parser.add_argument('--runs', type=int, default=7, help='fresh interpreters per function; the median is kept')
+    parser.add_argument('--compare', default=None, help='git revision to benchmark alongside the working tree')
+    args = parser.parse_args()
+
+    trees = [('working tree', BACKEND_DIR)]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.compare:
+            trees.insert(0, (args.compare, checkout_backend(args.compare, tmp)))
+
+        for label, backend_dir in trees:
+            functions = [
+                name for name in (args.functions or function_names())
+                if os.path.isfile(os.path.join(backend_dir, name, 'index.py'))
+            ]
+            report(label, {function: measure(backend_dir, function, args.runs) for function in functions})
+
+
+if __name__ == '__main__':
+    main()
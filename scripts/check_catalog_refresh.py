@@ -0,0 +1,95 @@
+"""
+Business: Check that warm spin workers pick up catalog changes via catalog_version and skip catalog queries otherwise
+Args: --admin-url of a local Postgres server, --database
+Returns: Exit code 1 if an unchanged spin queries the catalog or a new character is not spinnable on the next spin
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+import psycopg
+
+from loadtest import prepare
+from local_functions import load_function
+
+
+class QueryCounter:
+    """Counts executions of the spin handler's catalog queries on every psycopg cursor"""
+
+    def __init__(self, queries: List[str]):
+        self.queries = set(queries)
+        self.count = 0
+        self.original = psycopg.Cursor.execute
+
+    def __enter__(self) -> 'QueryCounter':
+        counter = self
+
+        def execute(cursor: psycopg.Cursor, query: Any, *args: Any, **kwargs: Any) -> Any:
+            if query in counter.queries:
+                counter.count += 1
+            return counter.original(cursor, query, *args, **kwargs)
+
+        psycopg.Cursor.execute = execute
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        psycopg.Cursor.execute = self.original
+
+
+def call(function: str, token: str, method: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    response = load_function(function).handler(
+        {'httpMethod': method, 'headers': {'Authorization': f'Bearer {token}'}, 'body': json.dumps(body)},
+        None
+    )
+    return response['statusCode'], json.loads(response['body'] or '{}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--admin-url', default=os.environ.get('LOADTEST_ADMIN_URL', 'postgresql://postgres@localhost/postgres'))
+    parser.add_argument('--database', default='rng_catalog_refresh', help='scratch database, dropped and recreated')
+    args = parser.parse_args()
+
+    user_tokens, admin_token = prepare(args.admin_url, args.database, 4, 'catalog_refresh_secret')
+    spin = load_function('spin')
+    catalog_queries = [spin.SPIN_POOL_QUERY, spin.SPIN_EVENTS_QUERY, spin.SPIN_QUESTS_QUERY]
+    failures = []
+
+    def spin_once(label: str, token: str, expect_catalog_queries: bool) -> None:
+        with QueryCounter(catalog_queries) as counter:
+            status, _ = call('spin', token, 'POST', {})
+        ok = status == 200 and (counter.count > 0) == expect_catalog_queries
+        print(f"{'ok' if ok else 'FAIL':<5}{label:<44}status {status}, {counter.count} catalog queries")
+        if not ok:
+            failures.append(label)
+
+    spin_once('cold container loads the catalog', user_tokens[0], True)
+    spin_once('unchanged catalog: no catalog queries', user_tokens[1], False)
+
+    with psycopg.connect(os.environ['DATABASE_URL']) as conn:
+        rarity_id = conn.execute("SELECT id FROM rarities ORDER BY chance LIMIT 1").fetchone()[0]
+    status, created = call('admin', admin_token, 'POST', {
+        'action': 'create_character',
+        'name': 'Catalog Refresh Probe',
+        'description': 'Created by check_catalog_refresh.py',
+        'rarity_id': rarity_id
+    })
+    if status != 201:
+        print(f"FAIL create_character returned {status}: {created}")
+        return 1
+
+    spin_once('catalog changed: reload on the next spin', user_tokens[2], True)
+    spinnable = any(row[0] == created['character_id'] for row in spin._spin_pool.characters)
+    print(f"{'ok' if spinnable else 'FAIL':<5}{'new character is in the spin pool':<44}id {created['character_id']}")
+    if not spinnable:
+        failures.append('new character is in the spin pool')
+
+    spin_once('unchanged again: no catalog queries', user_tokens[3], False)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
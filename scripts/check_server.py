@@ -0,0 +1,131 @@
+"""
+Business: Check that serve.py answers every tests.json scenario exactly like the in-process handler
+Args: --admin-url of a local Postgres server, --database, --workers, --functions
+Returns: Exit code 1 if a response misses its expectedStatus/expectedBody or differs from the handler's bytes
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+from itertools import count
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from loadtest import Scenario, load_scenarios, prepare
+from local_functions import load_function
+from serve import default_functions
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Added per response by the handlers' sampled timer and by the HTTP layer, not part of the comparison
+VOLATILE_HEADERS = {'server-timing', 'timing-allow-origin', 'content-length', 'connection'}
+
+
+def matches(expected: Any, actual: Any) -> bool:
+    # tests.json "partial" matching: listed keys only, type names stand for any value of that type
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and all(
+            key in actual and matches(value, actual[key]) for key, value in expected.items()
+        )
+    types = {'string': str, 'number': (int, float), 'boolean': bool, 'array': list, 'object': dict}
+    if isinstance(expected, str) and expected in types:
+        return isinstance(actual, types[expected]) and not (expected == 'number' and isinstance(actual, bool))
+    return expected == actual
+
+
+def comparable(headers: Dict[str, str]) -> Dict[str, str]:
+    return {name.lower(): str(value) for name, value in headers.items() if name.lower() not in VOLATILE_HEADERS}
+
+
+def call_handler(scenario: Scenario, event: Dict[str, Any], n: int) -> Tuple[int, Dict[str, str], bytes]:
+    context = SimpleNamespace(request_id=f'check-{n}', function_name=scenario.function)
+    response = load_function(scenario.function).handler(event, context)
+    return response['statusCode'], comparable(response.get('headers') or {}), (response.get('body') or '').encode('utf-8')
+
+
+def call_server(conn: http.client.HTTPConnection, scenario: Scenario, event: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes]:
+    query = urlencode(event['queryStringParameters'])
+    conn.request(
+        event['httpMethod'],
+        f"/{scenario.function}" + (f'?{query}' if query else ''),
+        body=event['body'].encode('utf-8') or None,
+        headers=event['headers']
+    )
+    response = conn.getresponse()
+    return response.status, comparable(dict(response.getheaders())), response.read()
+
+
+def start_server(workers: int, functions: List[str]) -> Tuple[subprocess.Popen, int]:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, 'serve.py'), '--port', '0', '--workers', str(workers),
+         '--functions', *functions],
+        cwd=SCRIPTS_DIR, stdout=subprocess.PIPE, text=True
+    )
+    banner = process.stdout.readline()
+    if not banner.startswith('serving'):
+        process.kill()
+        raise SystemExit(f'serve.py did not start: {banner!r}')
+    port = int(banner.split('http://', 1)[1].split(' ', 1)[0].rsplit(':', 1)[1])
+    return process, port
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--admin-url', default=os.environ.get('LOADTEST_ADMIN_URL', 'postgresql://postgres@localhost/postgres'))
+    parser.add_argument('--database', default='rng_check_server', help='scratch database, dropped and recreated')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--functions', nargs='*', default=None, help='default: every function in func2url.json')
+    args = parser.parse_args()
+
+    functions = args.functions or default_functions()
+    scenarios = load_scenarios(functions)
+    # Three calls per scenario, each with its own user so spins are never on cooldown
+    user_tokens, admin_token = prepare(args.admin_url, args.database, 3 * len(scenarios), 'check_server_secret')
+    os.environ['TIMING_SAMPLE_RATE'] = '0'
+
+    process, port = start_server(args.workers, functions)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    sequence = count()
+    failures = 0
+    try:
+        for scenario in scenarios:
+            numbers = [next(sequence) for _ in range(3)]
+            events = [scenario.build_event(user_tokens[n], admin_token, n) for n in numbers]
+            # Handler, server, handler: when both handler calls agree byte for byte the response is
+            # deterministic and the server's must equal it; otherwise only status and headers are compared
+            before = call_handler(scenario, events[0], numbers[0])
+            served = call_server(conn, scenario, events[1])
+            after = call_handler(scenario, events[2], numbers[2])
+
+            problems: List[str] = []
+            if scenario.expected_status is not None and served[0] != scenario.expected_status:
+                problems.append(f'status {served[0]}, expected {scenario.expected_status}')
+            expected_body: Optional[Any] = scenario.test.get('expectedBody')
+            if expected_body is not None and not matches(expected_body, json.loads(served[2] or b'null')):
+                problems.append(f'body does not match expectedBody: {served[2][:200]!r}')
+            if served[0] != before[0] or served[1] != before[1]:
+                problems.append(f'server {served[:2]} vs handler {before[:2]}')
+            deterministic = before == after
+            if deterministic and served[2] != before[2]:
+                problems.append(f'body differs from the handler: {served[2][:120]!r} vs {before[2][:120]!r}')
+
+            status = 'FAIL' if problems else 'ok'
+            detail = 'byte-identical' if deterministic else 'status and headers (body varies per call)'
+            print(f"{status:<5}{scenario.name[:60]:<62}{served[0]}  {detail}")
+            for problem in problems:
+                print(f"       {problem}")
+            failures += bool(problems)
+    finally:
+        conn.close()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
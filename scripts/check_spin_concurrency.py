@@ -0,0 +1,118 @@
+"""
+Business: Check that concurrent spins of one user are paid for exactly once each, for the cooldown and free spins
+Args: --admin-url of a local Postgres server, --database, --threads fired at once per case
+Returns: Exit code 1 if a case grants more (or fewer) spins than the user could pay for
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List, NamedTuple, Tuple
+
+import jwt
+import psycopg
+
+from loadtest import prepare
+from local_functions import load_function
+
+JWT_SECRET = 'spin_concurrency_secret'
+
+
+class Case(NamedTuple):
+    name: str
+    cooled_down: bool  # False puts the user inside the hourly cooldown first
+    free_spins: int
+    count: int  # pulls per request
+
+    def expected_grants(self) -> int:
+        return (self.free_spins + self.cooled_down) // self.count
+
+
+CASES = [
+    Case('hourly cooldown, single pulls', True, 0, 1),
+    Case('free spins during the cooldown', False, 3, 1),
+    Case('cooldown plus free spins', True, 3, 1),
+    Case('multi-pulls paid by cooldown plus free spins', True, 5, 3),
+]
+
+
+def fire(token: str, count: int, threads: int) -> Counter:
+    # Every thread is released at once, so the claims really race in Postgres
+    spin = load_function('spin')
+    barrier = threading.Barrier(threads)
+    event = {
+        'httpMethod': 'POST',
+        'headers': {'Authorization': f'Bearer {token}'},
+        'body': json.dumps({'count': count})
+    }
+
+    def client(n: int) -> int:
+        barrier.wait()
+        return spin.handler(event, SimpleNamespace(request_id=f'concurrency-{n}'))['statusCode']
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return Counter(executor.map(client, range(threads)))
+
+
+def user_state(conn: psycopg.Connection, user_id: int) -> Tuple[int, int]:
+    total_spins, free_spins = conn.execute(
+        "SELECT COALESCE(total_spins, 0), free_spins FROM users WHERE id = %s", (user_id,)
+    ).fetchone()
+    return total_spins, free_spins
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--admin-url', default=os.environ.get('LOADTEST_ADMIN_URL', 'postgresql://postgres@localhost/postgres'))
+    parser.add_argument('--database', default='rng_spin_concurrency', help='scratch database, dropped and recreated')
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    # Enough pooled connections that every thread reaches the claim at about the same time
+    os.environ.setdefault('DB_POOL_MAX_SIZE', str(args.threads))
+    os.environ['TIMING_SAMPLE_RATE'] = '0'
+    user_tokens, _ = prepare(args.admin_url, args.database, len(CASES), JWT_SECRET)
+    failures: List[str] = []
+
+    with psycopg.connect(os.environ['DATABASE_URL'], autocommit=True) as conn:
+        # Quest rewards would add free spins mid-race and blur the expected counts
+        conn.execute("UPDATE daily_quests SET is_active = false")
+
+        for case, token in zip(CASES, user_tokens):
+            user_id = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])['user_id']
+            conn.execute(
+                "UPDATE users SET free_spins = %s, last_spin = CASE WHEN %s THEN NULL ELSE now() AT TIME ZONE 'utc' END "
+                "WHERE id = %s",
+                (case.free_spins, case.cooled_down, user_id)
+            )
+            total_before, _ = user_state(conn, user_id)
+
+            statuses = fire(token, case.count, args.threads)
+            total_after, free_after = user_state(conn, user_id)
+
+            grants = case.expected_grants()
+            expected = Counter({200: grants, 429: args.threads - grants})
+            spent = case.free_spins - free_after + (1 if case.cooled_down and grants else 0)
+            problems = []
+            if +statuses != +expected:
+                problems.append(f'statuses {dict(statuses)}, expected {dict(+expected)}')
+            if total_after - total_before != grants * case.count:
+                problems.append(f'total_spins grew by {total_after - total_before}, expected {grants * case.count}')
+            if spent != grants * case.count:
+                problems.append(f'{spent} spins paid for {grants * case.count} pulls')
+
+            print(f"{'FAIL' if problems else 'ok':<5}{case.name:<48}{args.threads} threads -> {dict(statuses)}")
+            for problem in problems:
+                print(f"       {problem}")
+            if problems:
+                failures.append(case.name)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
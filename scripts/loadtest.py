@@ -0,0 +1,276 @@
+"""
+Business: Local load-test harness replaying backend/*/tests.json against a local Postgres
+Args: --admin-url of a local Postgres server, --users, --requests, --concurrency, --functions
+Returns: Prints throughput and p50/p95/p99 latency per endpoint and per status code; exit code 1 if any
+response missed its expectedStatus
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import count
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse
+
+import bcrypt
+import jwt
+import psycopg
+
+from local_functions import REPO_DIR, BACKEND_DIR, function_names, load_function
+
+MIGRATIONS_DIR = os.path.join(REPO_DIR, 'db_migrations')
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'catalog.json')
+
+# Placeholders used in tests.json that stand for real tokens
+USER_TOKEN_PLACEHOLDER = 'valid_jwt_token_here'
+ADMIN_TOKEN_PLACEHOLDER = 'admin_jwt_token_here'
+ADMIN_USERNAME = 'Admin'
+ADMIN_PASSWORD = 'Satoru1212'
+SEED_PASSWORD = 'password123'
+
+# A user can spin once per cooldown, so every request to these functions gets a seeded user of
+# its own; reusing users would turn most of them into cooldown 429s
+ONE_SHOT_FUNCTIONS = {'spin'}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def database_url_for(admin_url: str, database: str) -> str:
+    return urlunparse(urlparse(admin_url)._replace(path=f'/{database}'))
+
+
+def apply_migrations(database_url: str) -> List[str]:
+    applied = []
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, 'V*.sql'))):
+            with open(path) as f:
+                conn.execute(f.read())
+            applied.append(os.path.basename(path))
+    return applied
+
+
+def create_database(admin_url: str, database: str) -> str:
+    with psycopg.connect(admin_url, autocommit=True) as conn:
+        conn.execute(f'DROP DATABASE IF EXISTS "{database}" WITH (FORCE)')
+        conn.execute(f'CREATE DATABASE "{database}"')
+    return database_url_for(admin_url, database)
+
+
+def seed(database_url: str, users: int) -> Tuple[List[Tuple[int, str]], Tuple[int, str]]:
+    # One bcrypt hash shared by all seeded users keeps seeding fast
+    password_hash = bcrypt.hashpw(SEED_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    admin_hash = bcrypt.hashpw(ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    with open(FIXTURE) as f:
+        catalog = json.load(f)
+
+    with psycopg.connect(database_url) as conn:
+        with conn.cursor() as cur:
+            # The migration ships a placeholder hash for Admin; make the tests.json login work locally
+            cur.execute(
+                "UPDATE users SET password_hash = %s WHERE username = %s RETURNING id",
+                (admin_hash, ADMIN_USERNAME)
+            )
+            admin_id = cur.fetchone()[0]
+
+            cur.execute("SELECT id, name FROM rarities")
+            rarity_ids = {name: rarity_id for rarity_id, name in cur.fetchall()}
+            fixture_rarities = {r['id']: r['name'] for r in catalog['rarities']}
+            cur.executemany(
+                """
+                INSERT INTO characters (name, description, image_url, rarity_id, is_limited, limited_until, created_by)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                [
+                    (c['name'], c['description'], c['image_url'], rarity_ids[fixture_rarities[c['rarity_id']]],
+                     c['is_limited'], c['limited_until'], admin_id)
+                    for c in catalog['characters']
+                ]
+            )
+
+            cur.execute(
+                """
+                INSERT INTO users (username, password_hash)
+                SELECT 'loadtest_' || n, %s FROM generate_series(1, %s) AS n
+                RETURNING id, username
+                """,
+                (password_hash, users)
+            )
+            seeded = cur.fetchall()
+
+    return seeded, (admin_id, ADMIN_USERNAME)
+
+
+def mint_token(jwt_secret: str, user_id: int, username: str, is_admin: bool) -> str:
+    now = datetime.utcnow()
+    return jwt.encode(
+        {'user_id': user_id, 'username': username, 'is_admin': is_admin,
+         'exp': now + timedelta(days=7), 'iat': now},
+        jwt_secret,
+        algorithm='HS256'
+    )
+
+
+class Scenario:
+    def __init__(self, function: str, test: Dict[str, Any]):
+        self.function = function
+        self.test = test
+        self.name = f"{function}: {test['name']}"
+        self.expected_status = test.get('expectedStatus')
+        self.one_shot = function in ONE_SHOT_FUNCTIONS
+
+    def build_event(self, user_token: str, admin_token: str, sequence: int) -> Dict[str, Any]:
+        headers = {}
+        for key, value in (self.test.get('headers') or {}).items():
+            value = value.replace(USER_TOKEN_PLACEHOLDER, user_token).replace(ADMIN_TOKEN_PLACEHOLDER, admin_token)
+            headers[key] = value
+
+        body = self.test.get('body')
+        if isinstance(body, dict) and body.get('action') == 'register':
+            # A fixed username would only register once; keep the scenario meaningful under load
+            body = dict(body, username=f"{body['username']}_{sequence}")
+
+        return {
+            'httpMethod': self.test.get('method', 'GET'),
+            'headers': headers,
+            'queryStringParameters': self.test.get('queryParams') or {},
+            'body': json.dumps(body) if body is not None else '',
+            'isBase64Encoded': False
+        }
+
+
+def load_scenarios(functions: List[str]) -> List[Scenario]:
+    scenarios = []
+    for function in functions:
+        path = os.path.join(BACKEND_DIR, function, 'tests.json')
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            for test in json.load(f)['tests']:
+                scenarios.append(Scenario(function, test))
+    return scenarios
+
+
+def run(scenarios: List[Scenario], user_tokens: List[str], admin_token: str, requests: int, concurrency: int,
+        one_shot_tokens: Optional[Iterator[str]] = None) -> Tuple[Dict[str, Dict[int, List[float]]], Dict[str, float]]:
+    samples: Dict[str, Dict[int, List[float]]] = defaultdict(lambda: defaultdict(list))
+    lock = threading.Lock()
+    sequence = count(1)
+    elapsed: Dict[str, float] = {}
+
+    # Import every handler up front so module load is not timed or raced by worker threads
+    for scenario in scenarios:
+        load_function(scenario.function)
+
+    def call(scenario: Scenario) -> None:
+        with lock:
+            n = next(sequence)
+            token = next(one_shot_tokens) if scenario.one_shot and one_shot_tokens else random.choice(user_tokens)
+        event = scenario.build_event(token, admin_token, n)
+        handler = load_function(scenario.function).handler
+        context = SimpleNamespace(request_id=f'loadtest-{n}', function_name=scenario.function)
+        started = time.perf_counter()
+        response = handler(event, context)
+        latency = (time.perf_counter() - started) * 1000
+        with lock:
+            samples[scenario.name][response['statusCode']].append(latency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for scenario in scenarios:
+            started = time.perf_counter()
+            list(executor.map(call, [scenario] * requests))
+            elapsed[scenario.name] = time.perf_counter() - started
+
+    return samples, elapsed
+
+
+def report(scenarios: List[Scenario], samples: Dict[str, Dict[int, List[float]]], elapsed: Dict[str, float]) -> int:
+    mismatches = 0
+    print(f"{'endpoint / status':<56}{'count':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}  ms")
+    for scenario in scenarios:
+        by_status = samples[scenario.name]
+        everything = [latency for latencies in by_status.values() for latency in latencies]
+        if not everything:
+            continue
+        print(
+            f"{scenario.name[:55]:<56}{len(everything):>7}{len(everything) / elapsed[scenario.name]:>9.1f}"
+            f"{percentile(everything, 50):>9.2f}{percentile(everything, 95):>9.2f}{percentile(everything, 99):>9.2f}"
+        )
+        for status, latencies in sorted(by_status.items()):
+            marker = '' if status == scenario.expected_status else f'  (expected {scenario.expected_status})'
+            if marker:
+                mismatches += len(latencies)
+            print(
+                f"{'  ' + str(status):<56}{len(latencies):>7}{'':>9}"
+                f"{percentile(latencies, 50):>9.2f}{percentile(latencies, 95):>9.2f}{percentile(latencies, 99):>9.2f}"
+                f"{marker}"
+            )
+    return mismatches
+
+
+def prepare(admin_url: str, database: str, users: int, jwt_secret: str) -> Tuple[List[str], str]:
+    """
+    Business: Create a scratch database, apply every migration, seed users and point the handlers at it
+    Args: admin_url - connection to an existing local database, database - scratch name, users - seeded count
+    Returns: (user tokens, admin token)
+    """
+    database_url = create_database(admin_url, database)
+    apply_migrations(database_url)
+    seeded, (admin_id, admin_username) = seed(database_url, users)
+
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['JWT_SECRET'] = jwt_secret
+
+    user_tokens = [mint_token(jwt_secret, user_id, username, False) for user_id, username in seeded]
+    admin_token = mint_token(jwt_secret, admin_id, admin_username, True)
+    return user_tokens, admin_token
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--admin-url', default=os.environ.get('LOADTEST_ADMIN_URL', 'postgresql://postgres@localhost/postgres'))
+    parser.add_argument('--database', default='rng_loadtest', help='scratch database, dropped and recreated')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--functions', nargs='*', default=None, help='default: every backend/<name>/index.py')
+    parser.add_argument('--jwt-secret', default='loadtest_secret')
+    args = parser.parse_args()
+
+    if urlparse(args.admin_url).hostname not in ('localhost', '127.0.0.1', '::1', None, ''):
+        parser.error('the harness only runs against a local Postgres')
+
+    # Let the per-function pools open one connection per worker thread
+    os.environ.setdefault('DB_POOL_MAX_SIZE', str(args.concurrency))
+
+    scenarios = load_scenarios(args.functions or function_names())
+    one_shot = args.requests * sum(scenario.one_shot for scenario in scenarios)
+    tokens, admin_token = prepare(args.admin_url, args.database, args.users + one_shot, args.jwt_secret)
+    user_tokens = tokens[:args.users]
+
+    print(
+        f"{len(scenarios)} scenarios x {args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.users} users (+{one_shot} single-request users for {', '.join(sorted(ONE_SHOT_FUNCTIONS))})\n"
+    )
+    samples, elapsed = run(scenarios, user_tokens, admin_token, args.requests, args.concurrency, iter(tokens[args.users:]))
+    mismatches = report(scenarios, samples, elapsed)
+
+    if mismatches:
+        print(f"\n{mismatches} responses did not match expectedStatus")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+"""
+Business: Load backend/<name>/index.py handlers in-process for local tools and benchmarks
+Args: function names, i.e. directory names under backend/
+Returns: Imported handler modules, one per function
+"""
+import importlib.util
+import os
+import sys
+from types import ModuleType
+from typing import Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+
+_modules: Dict[str, ModuleType] = {}
+
+
+def function_names() -> List[str]:
+    # Every backend/<name>/index.py, including functions not yet deployed to func2url.json
+    return sorted(
+        name for name in os.listdir(BACKEND_DIR)
+        if os.path.isfile(os.path.join(BACKEND_DIR, name, 'index.py'))
+    )
+
+
+def import_index(function_dir: str, module_name: str) -> ModuleType:
+    """
+    Business: Import one function's index.py the way its own container would
+    Args: function_dir - backend/<name> directory (of any checkout), module_name - unique name for the module
+    Returns: The imported module, bound to its own copy of the vendored runtime module
+    """
+    # Every function is an index.py next to its own runtime.py, so both are imported from the
+    # function's directory and the shared 'runtime' name is released again afterwards: each
+    # function keeps its own pools and caches, as it would in its own container
+    sys.path.insert(0, function_dir)
+    sys.modules.pop('runtime', None)
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(function_dir, 'index.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.modules.pop('runtime', None)
+        sys.path.remove(function_dir)
+    return module
+
+
+def load_function(name: str) -> ModuleType:
+    if name not in _modules:
+        _modules[name] = import_index(os.path.join(BACKEND_DIR, name), f'backend_{name}')
+    return _modules[name]
@@ -0,0 +1,293 @@
+"""
+Business: Self-hosted HTTP server for the backend functions: pre-forked workers, each keeping its handlers warm
+and serving one request at a time, like a function container (scale with --workers)
+Args: --host, --port, --workers, --functions (default: the names in backend/func2url.json), --access-log
+Returns: Serves POST/GET/OPTIONS /<function> until SIGTERM or Ctrl+C; SIGHUP reloads the workers gracefully
+"""
+import argparse
+import base64
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from local_functions import BACKEND_DIR, load_function
+
+FUNC2URL = os.path.join(BACKEND_DIR, 'func2url.json')
+
+# A client that has not sent its whole request by then is dropped, so one slow client cannot
+# stall a worker for long
+REQUEST_TIMEOUT_SECONDS = 5.0
+
+# Workers that die this soon after starting are restarted with a delay, so a handler that
+# fails to import does not turn the master into a fork loop
+MIN_WORKER_UPTIME_SECONDS = 1.0
+RESTART_DELAY_SECONDS = 1.0
+
+
+def default_functions() -> List[str]:
+    with open(FUNC2URL) as f:
+        return list(json.load(f))
+
+
+def build_event(method: str, target: str, headers: Any, body: bytes, source_ip: str, request_id: str) -> Dict[str, Any]:
+    """
+    Business: Adapt one HTTP request into the event shape the cloud functions receive
+    Args: method, target (path and query string), headers (http.client.HTTPMessage), raw body, client IP, request id
+    Returns: event dict with httpMethod, headers, queryStringParameters, body and isBase64Encoded
+    """
+    url = urlsplit(target)
+    multi_params = parse_qs(url.query, keep_blank_values=True)
+    multi_headers: Dict[str, List[str]] = {}
+    for name, value in headers.items():
+        multi_headers.setdefault(name, []).append(value)
+
+    try:
+        text, is_base64 = body.decode('utf-8'), False
+    except UnicodeDecodeError:
+        text, is_base64 = base64.b64encode(body).decode('ascii'), True
+
+    return {
+        'httpMethod': method,
+        'url': target,
+        'path': url.path,
+        'headers': {name: values[-1] for name, values in multi_headers.items()},
+        'multiValueHeaders': multi_headers,
+        'queryStringParameters': {name: values[-1] for name, values in multi_params.items()},
+        'multiValueQueryStringParameters': multi_params,
+        'requestContext': {
+            'requestId': request_id,
+            'httpMethod': method,
+            'identity': {'sourceIp': source_ip}
+        },
+        'body': text,
+        'isBase64Encoded': is_base64
+    }
+
+
+class FunctionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes /<function> to that function's handler and writes its response back unchanged.
+    HTTP/1.0: the connection closes after each response, so no idle keep-alive client can
+    hold a worker that serves one request at a time.
+    """
+
+    timeout = REQUEST_TIMEOUT_SECONDS
+
+    def do_GET(self) -> None:
+        self.dispatch()
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = do_GET
+
+    def dispatch(self) -> None:
+        name = urlsplit(self.path).path.strip('/').split('/', 1)[0]
+        handler = self.server.handlers.get(name)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if handler is None:
+            self.respond({
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': f'Unknown function: {name or "/"}'})
+            })
+            return
+
+        request_id = uuid.uuid4().hex
+        event = build_event(self.command, self.path, self.headers, body, self.client_address[0], request_id)
+        context = SimpleNamespace(request_id=request_id, function_name=name)
+        try:
+            response = handler(event, context)
+        except Exception:
+            # The cloud runtime answers an unhandled exception with a 502 and logs the traceback
+            traceback.print_exc()
+            response = {
+                'statusCode': 502,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': 'Function raised an unhandled exception'})
+            }
+        self.respond(response)
+
+    def respond(self, response: Dict[str, Any]) -> None:
+        body = response.get('body') or ''
+        data = base64.b64decode(body) if response.get('isBase64Encoded') else body.encode('utf-8')
+
+        # Only the status line and the handler's own headers: no Server or Date, so what the
+        # client sees is exactly what the function returned
+        self.send_response_only(response.get('statusCode', 200))
+        for name, value in (response.get('headers') or {}).items():
+            self.send_header(name, str(value))
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+
+class WorkerServer(HTTPServer):
+    """
+    One worker's server on the listening socket shared by every worker. Requests are
+    handled one at a time on the worker's main thread, so the handlers' module-level pools
+    and caches are never used by two requests at once; concurrency comes from --workers.
+    """
+
+    def __init__(self, listener: socket.socket, handlers: Dict[str, Callable], access_log: bool):
+        super().__init__(listener.getsockname()[:2], FunctionRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listener
+        self.handlers = handlers
+        self.access_log = access_log
+
+    def drain(self) -> None:
+        # shutdown() blocks until serve_forever() returns, which is after the request in
+        # flight, so it cannot run in the signal handler
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+def run_worker(listener: socket.socket, functions: List[str], access_log: bool) -> None:
+    # Ctrl+C reaches the whole process group; the master turns it into a graceful SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    # Imported after the fork, so each worker has its own pools and caches and a reload
+    # picks up code changes
+    handlers = {name: load_function(name).handler for name in functions}
+    server = WorkerServer(listener, handlers, access_log)
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.drain())
+
+    server.serve_forever()
+    server.server_close()
+
+
+class Master:
+    """Keeps --workers workers alive, replaces them all on SIGHUP and drains them on SIGTERM"""
+
+    def __init__(self, listener: socket.socket, functions: List[str], workers: int, access_log: bool):
+        self.listener = listener
+        self.functions = functions
+        self.size = workers
+        self.access_log = access_log
+        self.workers: Dict[int, float] = {}  # pid -> start time, current generation only
+        self.retiring: set = set()
+        self.reload_requested = False
+        self.stop_requested = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.listener, self.functions, self.access_log)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+
+    def signal_all(self, pids: Any, signum: int) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            started = self.workers.pop(pid, None)
+            if started is not None and not self.stop_requested:
+                print(f"worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting", flush=True)
+                if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                    time.sleep(RESTART_DELAY_SECONDS)
+
+    def reload(self) -> None:
+        # The new generation shares the listening socket, so it starts accepting before the old
+        # one stops and no connection is refused during the switch
+        old = list(self.workers)
+        self.workers = {}
+        for _ in range(self.size):
+            self.spawn()
+        self.retiring.update(old)
+        self.signal_all(old, signal.SIGTERM)
+        print(f"reloaded: {len(old)} workers draining, {self.size} started", flush=True)
+
+    def run(self) -> None:
+        def request_reload(signum: int, frame: Any) -> None:
+            self.reload_requested = True
+
+        def request_stop(signum: int, frame: Any) -> None:
+            self.stop_requested = True
+
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        for _ in range(self.size):
+            self.spawn()
+
+        while not self.stop_requested:
+            time.sleep(0.2)
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            while len(self.workers) < self.size and not self.stop_requested:
+                self.spawn()
+
+        self.signal_all(list(self.workers) + list(self.retiring), signal.SIGTERM)
+        while True:
+            try:
+                os.wait()
+            except ChildProcessError:
+                break
+        self.listener.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help='0 picks a free port')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--functions', nargs='*', default=None, help='default: every function in func2url.json')
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+
+    functions = args.functions or default_functions()
+    missing = [name for name in functions if not os.path.isfile(os.path.join(BACKEND_DIR, name, 'index.py'))]
+    if missing:
+        parser.error(f"no backend/<name>/index.py for: {', '.join(missing)}")
+
+    listener = socket.create_server((args.host, args.port), backlog=1024)
+    host, port = listener.getsockname()[:2]
+    print(
+        f"serving {', '.join(functions)} on http://{host}:{port} with {args.workers} workers "
+        f"(pid {os.getpid()}, SIGHUP to reload)",
+        flush=True
+    )
+    Master(listener, functions, args.workers, args.access_log).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Business: Monte Carlo drop-rate simulator for the spin selection, vectorized with NumPy
+Args: --fixture catalog JSON or --database-url, --draws, --batch-size, --seed, --at (limited characters and events)
+Returns: Prints effective vs configured per-rarity odds, per-character odds and draws per second
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from local_functions import load_function
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'catalog.json')
+
+
+def load_fixture(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[tuple]]:
+    with open(path) as f:
+        snapshot = json.load(f)
+    for char in snapshot['characters']:
+        if char.get('limited_until'):
+            char['limited_until'] = datetime.fromisoformat(char['limited_until'])
+    # Optional rate_boost events, same columns as SPIN_EVENTS_QUERY
+    events = [
+        (e['id'], datetime.fromisoformat(e['start_time']), datetime.fromisoformat(e['end_time']), e.get('config'))
+        for e in snapshot.get('events', [])
+    ]
+    return snapshot['rarities'], snapshot['characters'], events
+
+
+def load_database(database_url: str, at: datetime) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[tuple]]:
+    import psycopg
+    from psycopg.rows import dict_row
+
+    with psycopg.connect(database_url, row_factory=dict_row) as conn:
+        rarities = conn.execute("SELECT id, name, color, chance FROM rarities").fetchall()
+        characters = conn.execute("""
+            SELECT id, name, description, image_url, rarity_id, is_active, is_limited, limited_until
+            FROM characters
+        """).fetchall()
+        with conn.cursor(row_factory=psycopg.rows.tuple_row) as cur:
+            cur.execute(load_function('spin').SPIN_EVENTS_QUERY, (at,))
+            events = cur.fetchall()
+    return rarities, characters, events
+
+
+def spin_pool_rows(rarities: List[Dict[str, Any]], characters: List[Dict[str, Any]]) -> List[tuple]:
+    # Same row shape and is_active filter as SPIN_POOL_QUERY in backend/spin
+    by_id = {r['id']: r for r in rarities}
+    return [
+        (c['id'], c['name'], c.get('description'), c.get('image_url'), c['is_limited'], c.get('limited_until'),
+         by_id[c['rarity_id']]['name'], by_id[c['rarity_id']]['color'], by_id[c['rarity_id']]['chance'])
+        for c in characters
+        if c['is_active'] and c['rarity_id'] in by_id
+    ]
+
+
+def expected_odds(rows: List[tuple], events: List[tuple], at: datetime) -> Dict[int, float]:
+    """
+    Business: Configured odds per character at a given time, straight from chances and event configs
+    Args: rows - spin pool rows, events - (id, start_time, end_time, config) rate_boost rows, at - evaluation time
+    Returns: character id -> chance x active multipliers / sum over the live pool; independent of the alias table
+    """
+    weights = {}
+    for row in rows:
+        if row[4] and not (row[5] and row[5] > at):
+            continue  # limited character that has expired by 'at'
+        weight = float(row[8])
+        for _, start_time, end_time, config in events:
+            if not start_time <= at < end_time:
+                continue
+            config = json.loads(config) if isinstance(config, str) else (config or {})
+            for key, factors in (('rarity', config.get('rarity_multipliers')), ('character', config.get('featured_characters'))):
+                if not isinstance(factors, dict):
+                    continue
+                factor = factors.get(row[6] if key == 'rarity' else str(row[0]), 1.0)
+                try:
+                    weight *= max(0.0, float(factor))
+                except (TypeError, ValueError):
+                    pass  # the spin function skips unparseable factors too
+        weights[row[0]] = weight
+
+    total = sum(weights.values())
+    return {char_id: weight / total if total > 0 else 1 / len(weights) for char_id, weight in weights.items()}
+
+
+def simulate(prob: np.ndarray, alias: np.ndarray, draws: int, batch_size: int, seed: int) -> np.ndarray:
+    # Vectorized alias-table draw: column i = floor(u * n), keep it if v < prob[i], else alias[i]
+    rng = np.random.default_rng(seed)
+    n = len(prob)
+    counts = np.zeros(n, dtype=np.int64)
+    remaining = draws
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        columns = (rng.random(size) * n).astype(np.intp)
+        picks = np.where(rng.random(size) < prob[columns], columns, alias[columns])
+        counts += np.bincount(picks, minlength=n)
+        remaining -= size
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fixture', default=None, help=f'catalog JSON (default {DEFAULT_FIXTURE})')
+    parser.add_argument('--database-url', default=None, help='read the catalog from Postgres instead')
+    parser.add_argument('--draws', type=int, default=10_000_000)
+    parser.add_argument('--batch-size', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--at', default=None, help='ISO time to evaluate limited characters at (default now, UTC)')
+    parser.add_argument('--top', type=int, default=20, help='characters to list, rarest first')
+    args = parser.parse_args()
+
+    at = datetime.fromisoformat(args.at) if args.at else datetime.utcnow()
+    if args.database_url:
+        rarities, characters, events = load_database(args.database_url, at)
+    else:
+        rarities, characters, events = load_fixture(args.fixture or DEFAULT_FIXTURE)
+
+    spin = load_function('spin')
+    rows = spin_pool_rows(rarities, characters)
+    pool = spin.SpinPool(rows, at, spin.compile_rate_boosts(events))
+
+    if not pool.characters:
+        parser.error('no characters available for spinning at the given time')
+
+    prob = np.asarray(pool.prob, dtype=np.float64)
+    alias = np.asarray(pool.alias, dtype=np.intp)
+
+    started = time.perf_counter()
+    counts = simulate(prob, alias, args.draws, args.batch_size, args.seed)
+    elapsed = time.perf_counter() - started
+
+    # Expected odds from the catalog and event configs, not from the table under test
+    configured = expected_odds(rows, events, at)
+    expected = np.asarray([configured[row[0]] for row in pool.characters], dtype=np.float64)
+    observed = counts / args.draws
+
+    print(f"{args.draws:,} draws over {len(pool.characters)} characters at {at.isoformat()}")
+    if pool.active_event_ids:
+        print(f"active rate_boost events: {pool.active_event_ids}")
+    print(f"{args.draws / elapsed:,.0f} draws/s ({elapsed:.3f}s)\n")
+
+    print(f"{'rarity':<12}{'chars':>6}{'configured':>12}{'effective':>12}{'observed':>12}")
+    for rarity in sorted(rarities, key=lambda r: -float(r['chance'])):
+        members = [i for i, row in enumerate(pool.characters) if row[6] == rarity['name']]
+        print(
+            f"{rarity['name']:<12}{len(members):>6}{float(rarity['chance']):>12.4%}"
+            f"{expected[members].sum():>12.4%}{observed[members].sum():>12.4%}"
+        )
+
+    print(f"\n{'character':<24}{'rarity':<12}{'expected':>12}{'observed':>12}")
+    for i in np.argsort(expected)[:args.top]:
+        row = pool.characters[i]
+        print(f"{row[1][:23]:<24}{row[6]:<12}{expected[i]:>12.5%}{observed[i]:>12.5%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Business: Vendor backend/_runtime/runtime.py into every backend/<function>/ so each deploys with it
+Args: --check to only compare the copies (for CI) instead of rewriting them
+Returns: Exit code 1 with --check if any function's runtime.py differs from the source
+"""
+import argparse
+import os
+import sys
+from typing import List
+
+from local_functions import BACKEND_DIR, function_names
+
+SOURCE = os.path.join(BACKEND_DIR, '_runtime', 'runtime.py')
+
+
+def stale_copies(source: str) -> List[str]:
+    stale = []
+    for name in function_names():
+        path = os.path.join(BACKEND_DIR, name, 'runtime.py')
+        current = None
+        if os.path.exists(path):
+            with open(path) as f:
+                current = f.read()
+        if current != source:
+            stale.append(path)
+    return stale
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--check', action='store_true', help='report drift and exit 1 instead of rewriting')
+    args = parser.parse_args()
+
+    with open(SOURCE) as f:
+        source = f.read()
+    stale = stale_copies(source)
+
+    for path in stale:
+        relative = os.path.relpath(path, os.path.dirname(BACKEND_DIR))
+        if args.check:
+            print(f"{relative} differs from backend/_runtime/runtime.py; run scripts/sync_runtime.py")
+        else:
+            with open(path, 'w') as f:
+                f.write(source)
+            print(f"updated {relative}")
+
+    return 1 if args.check and stale else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
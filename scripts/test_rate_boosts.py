@@ -0,0 +1,134 @@
+"""
+Business: Rate-boost event handling of the spin pool: overlapping events, window boundaries, bad configs, limited expiry
+Args: run with `python -m pytest scripts/`; no database needed
+Returns: pytest results
+"""
+import json
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from local_functions import load_function
+from simulate_drop_rates import expected_odds
+
+START = datetime(2030, 6, 1)
+END = datetime(2030, 6, 8)
+TICK = timedelta(microseconds=1)
+
+# Spin pool rows: (id, name, description, image_url, is_limited, limited_until, rarity, color, chance)
+ROWS = [
+    (1, 'Farmer', None, None, False, None, 'Common', '#9CA3AF', 0.5),
+    (2, 'Knight', None, None, False, None, 'Rare', '#3B82F6', 0.3),
+    (3, 'Archmage', None, None, False, None, 'Epic', '#8B5CF6', 0.15),
+    (4, 'Dragon', None, None, False, None, 'Legendary', '#F59E0B', 0.04),
+    (5, 'Winter Sorceress', None, None, True, START + timedelta(days=3), 'Legendary', '#F59E0B', 0.04),
+]
+
+
+def implied_odds(pool) -> Dict[int, float]:
+    # Probability of each character under the pool's current alias table
+    n = len(pool.characters)
+    odds = {row[0]: p / n for row, p in zip(pool.characters, pool.prob)}
+    for p, a in zip(pool.prob, pool.alias):
+        odds[pool.characters[a][0]] += (1 - p) / n
+    return odds
+
+
+def normalised(weights: Dict[int, float]) -> Dict[int, float]:
+    total = sum(weights.values())
+    return {char_id: weight / total for char_id, weight in weights.items()}
+
+
+def assert_odds(actual: Dict[int, float], expected: Dict[int, float]) -> None:
+    assert sorted(actual) == sorted(expected)
+    for char_id, probability in expected.items():
+        assert math.isclose(actual[char_id], probability, abs_tol=1e-12), char_id
+
+
+def pool_at(events: List[tuple], now: datetime):
+    spin = load_function('spin')
+    return spin.SpinPool(ROWS, now, spin.compile_rate_boosts(events))
+
+
+def test_overlapping_events_multiply():
+    events = [
+        (1, START, END, {'rarity_multipliers': {'Legendary': 2.0}}),
+        (2, START + timedelta(days=1), END + timedelta(days=1), {'featured_characters': {'4': 5.0}}),
+        (3, START + timedelta(days=1), END, {'rarity_multipliers': {'Legendary': 1.5, 'Common': 0.5}}),
+    ]
+    now = START + timedelta(days=2)
+    pool = pool_at(events, now)
+
+    assert sorted(pool.active_event_ids) == [1, 2, 3]
+    expected = normalised({1: 0.5 * 0.5, 2: 0.3, 3: 0.15, 4: 0.04 * 2.0 * 5.0 * 1.5, 5: 0.04 * 2.0 * 1.5})
+    assert_odds(implied_odds(pool), expected)
+    assert_odds(expected_odds(ROWS, events, now), expected)
+
+
+def test_refresh_switches_at_event_boundaries():
+    events = [(1, START, END, {'rarity_multipliers': {'Rare': 3.0}})]
+    unboosted = normalised({1: 0.5, 2: 0.3, 3: 0.15, 4: 0.04, 5: 0.04})
+    boosted = normalised({1: 0.5, 2: 0.9, 3: 0.15, 4: 0.04, 5: 0.04})
+
+    pool = pool_at(events, START - timedelta(hours=1))
+    assert pool.next_breakpoint == START
+    assert_odds(implied_odds(pool), unboosted)
+
+    pool.refresh(START - TICK)
+    assert pool.active_event_ids == []
+    assert_odds(implied_odds(pool), unboosted)
+
+    # start_time is inclusive, end_time exclusive
+    pool.refresh(START)
+    assert pool.active_event_ids == [1]
+    assert_odds(implied_odds(pool), boosted)
+
+    pool.refresh(END - TICK)
+    assert pool.active_event_ids == [1]
+
+    pool.refresh(END)
+    assert pool.active_event_ids == []
+    assert pool.next_breakpoint is None
+    # The limited character expired inside the event; only the four permanent ones remain
+    assert_odds(implied_odds(pool), normalised({1: 0.5, 2: 0.3, 3: 0.15, 4: 0.04}))
+
+
+def test_bad_config_entries_are_skipped():
+    spin = load_function('spin')
+    config = {
+        'rarity_multipliers': {'Rare': 'lots', 'Epic': 3, 'Common': None, 'Legendary': '2'},
+        'featured_characters': {'x': 2.0, '1': -4.0, '2': '2.5', '3': [1]}
+    }
+    [(_, _, _, rarity_multipliers, character_multipliers)] = spin.compile_rate_boosts([(1, START, END, json.dumps(config))])
+    assert rarity_multipliers == {'Epic': 3.0, 'Legendary': 2.0}
+    # Negative factors clamp to 0, which takes the character out of the draw for the event
+    assert character_multipliers == {1: 0.0, 2: 2.5}
+
+    # Missing and empty configs are no-ops, not errors
+    boosts = spin.compile_rate_boosts([(2, START, END, None), (3, START, END, {}), (4, START, END, '{"rarity_multipliers": null}')])
+    assert [boost[3:] for boost in boosts] == [({}, {})] * 3
+
+    pool = pool_at([(1, START, END, config)], START)
+    expected = normalised({1: 0.0, 2: 0.3 * 2.5, 3: 0.15 * 3.0, 4: 0.04 * 2.0, 5: 0.04 * 2.0})
+    assert_odds(implied_odds(pool), expected)
+    assert_odds(expected_odds(ROWS, [(1, START, END, config)], START), expected)
+
+
+def test_limited_expiry_inside_event_window():
+    expiry = ROWS[4][5]
+    events = [(1, START, END, {'featured_characters': {'5': 10.0}, 'rarity_multipliers': {'Legendary': 2.0}})]
+    pool = pool_at(events, START)
+    assert pool.breakpoints == [START, expiry, END]
+
+    before = implied_odds(pool)
+    assert_odds(before, normalised({1: 0.5, 2: 0.3, 3: 0.15, 4: 0.08, 5: 0.8}))
+
+    pool.refresh(expiry - TICK)
+    assert 5 in implied_odds(pool)
+
+    # limited_until is exclusive: gone at the expiry instant, while the event's other boosts stay
+    pool.refresh(expiry)
+    assert pool.active_event_ids == [1]
+    assert pool.next_breakpoint == END
+    assert_odds(implied_odds(pool), normalised({1: 0.5, 2: 0.3, 3: 0.15, 4: 0.08}))
+    assert_odds(expected_odds(ROWS, events, expiry), normalised({1: 0.5, 2: 0.3, 3: 0.15, 4: 0.08}))
@@ -0,0 +1,48 @@
+"""
+Business: Run the vectorized simulate() on the catalog fixture and hold its observed odds to the configured ones
+Args: run with `python -m pytest -s scripts/test_simulate_drop_rates.py` to see the draws/s figures
+Returns: pytest results; each case records draws_per_second as a test property
+"""
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from local_functions import load_function
+from simulate_drop_rates import DEFAULT_FIXTURE, expected_odds, load_fixture, simulate, spin_pool_rows
+
+DRAWS = 2_000_000
+BATCH_SIZE = 250_000
+
+# Observed odds may stray this many standard errors from the configured ones; with fixed
+# seeds the check is deterministic, the margin only keeps a seed change from tripping it
+SIGMAS = 5
+
+
+@pytest.mark.parametrize('at', [
+    datetime(2026, 1, 1),  # no events, the limited character still in the pool
+    datetime(2030, 6, 6),  # both fixture events overlap
+    datetime(2030, 6, 9),  # only the featured-character event, the limited character expired
+])
+def test_simulate_matches_configured_odds(at: datetime, record_property) -> None:
+    rarities, characters, events = load_fixture(DEFAULT_FIXTURE)
+    spin = load_function('spin')
+    rows = spin_pool_rows(rarities, characters)
+    pool = spin.SpinPool(rows, at, spin.compile_rate_boosts(events))
+
+    started = time.perf_counter()
+    counts = simulate(
+        np.asarray(pool.prob, dtype=np.float64), np.asarray(pool.alias, dtype=np.intp), DRAWS, BATCH_SIZE, seed=7
+    )
+    draws_per_second = DRAWS / (time.perf_counter() - started)
+    record_property('draws_per_second', round(draws_per_second))
+    print(f"\n{at.isoformat()}: {DRAWS:,} draws at {draws_per_second:,.0f} draws/s")
+
+    assert counts.sum() == DRAWS
+    configured = expected_odds(rows, events, at)
+    for row, observed in zip(pool.characters, counts / DRAWS):
+        p = configured[row[0]]
+        tolerance = SIGMAS * math.sqrt(p * (1 - p) / DRAWS)
+        assert abs(observed - p) <= tolerance, f"{row[1]}: observed {observed:.5%}, configured {p:.5%}"
@@ -0,0 +1,105 @@
+"""
+Business: Statistical equivalence of SpinPool.draw (alias method) and the original cumulative linear scan
+Args: run with `python -m pytest scripts/`; no database needed
+Returns: pytest results; fixed seeds keep the chi-square checks deterministic
+"""
+import math
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from local_functions import load_function
+from simulate_drop_rates import DEFAULT_FIXTURE, load_fixture, spin_pool_rows
+
+NOW = datetime(2026, 1, 1, 12, 0)
+DRAWS = 200_000
+
+# Upper 0.1% point of the standard normal, for the chi-square critical values below
+Z_999 = 3.0902
+
+
+def chi_square_critical(df: int, z: float = Z_999) -> float:
+    # Wilson-Hilferty approximation of the chi-square quantile; accurate to well under 1% for df >= 3
+    k = 2 / (9 * df)
+    return df * (1 - k + z * math.sqrt(k)) ** 3
+
+
+def catalog() -> List[tuple]:
+    # The fixture's pool plus the rows the linear scan never had to special-case: a zero-chance
+    # rarity and limited characters that expired by NOW (the pool is compiled from rows read
+    # earlier, so it must drop them itself)
+    rarities, characters, _ = load_fixture(DEFAULT_FIXTURE)
+    rows = spin_pool_rows(rarities, characters)
+    rows.append((901, 'Retired Relic', None, None, False, None, 'Retired', '#000000', 0.0))
+    rows.append((902, 'Faded Phantom', None, None, True, NOW - timedelta(days=1), 'Legendary', '#F59E0B', 0.04))
+    rows.append((903, 'Expired Exactly Now', None, None, True, NOW, 'Epic', '#8B5CF6', 0.15))
+    return rows
+
+
+def linear_scan_draw(rows: List[tuple], rng: random.Random) -> tuple:
+    # The selection the spin handler used before the alias table
+    total_weight = sum(row[8] for row in rows)
+    random_value = rng.random() * total_weight
+    current_weight = 0
+    for row in rows:
+        current_weight += row[8]
+        if random_value <= current_weight:
+            return row
+    return rows[-1]
+
+
+def draw_counts(draw: Callable[[], tuple], draws: int) -> Counter:
+    return Counter(draw()[0] for _ in range(draws))
+
+
+def chi_square_fit(counts: Counter, expected: Dict[int, float], draws: int) -> float:
+    return sum((counts[key] - p * draws) ** 2 / (p * draws) for key, p in expected.items() if p > 0)
+
+
+def test_alias_draws_match_linear_scan():
+    spin = load_function('spin')
+    rows = catalog()
+    pool = spin.SpinPool(rows, NOW)
+
+    # What SPIN_POOL_QUERY would return at NOW: no expired limited rows
+    live = [row for row in rows if not row[4] or row[5] > NOW]
+    total = sum(row[8] for row in live)
+    expected = {row[0]: row[8] / total for row in live}
+
+    assert sorted(row[0] for row in pool.characters) == sorted(expected)
+
+    alias_rng = random.Random(20260101)
+    alias_counts = draw_counts(lambda: pool.draw(alias_rng), DRAWS)
+    scan_rng = random.Random(20260102)
+    scan_counts = draw_counts(lambda: linear_scan_draw(live, scan_rng), DRAWS)
+
+    # Zero-weight and expired rows are never drawn by either method
+    for never in (901, 902, 903):
+        assert alias_counts[never] == 0
+        assert scan_counts[never] == 0
+
+    # Goodness of fit of each method against the configured odds
+    df = sum(1 for p in expected.values() if p > 0) - 1
+    critical = chi_square_critical(df)
+    assert chi_square_fit(alias_counts, expected, DRAWS) < critical
+    assert chi_square_fit(scan_counts, expected, DRAWS) < critical
+
+    # And of the two samples against each other (homogeneity, equal sample sizes)
+    keys = [key for key, p in expected.items() if p > 0 and alias_counts[key] + scan_counts[key] > 0]
+    homogeneity = sum((alias_counts[key] - scan_counts[key]) ** 2 / (alias_counts[key] + scan_counts[key]) for key in keys)
+    assert homogeneity < chi_square_critical(len(keys) - 1)
+
+
+def test_alias_table_is_exact():
+    # The table's implied probabilities equal the normalised weights, zero weights included
+    spin = load_function('spin')
+    weights = [0.5, 0.3, 0.0, 0.15, 0.04, 0.0095, 0.0005, 0.0]
+    prob, alias = spin.build_alias_table(weights)
+    n = len(weights)
+    implied = [p / n for p in prob]
+    for p, a in zip(prob, alias):
+        implied[a] += (1 - p) / n
+    total = sum(weights)
+    for weight, probability in zip(weights, implied):
+        assert math.isclose(probability, weight / total, abs_tol=1e-12)
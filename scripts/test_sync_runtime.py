@@ -0,0 +1,12 @@
+"""
+Business: The runtime.py vendored into every backend function matches backend/_runtime/runtime.py
+Args: run with `python -m pytest scripts/`; fix a failure with `python scripts/sync_runtime.py`
+Returns: pytest results
+"""
+from sync_runtime import SOURCE, stale_copies
+
+
+def test_vendored_runtime_copies_match_source():
+    with open(SOURCE) as f:
+        source = f.read()
+    assert stale_copies(source) == [], 'run scripts/sync_runtime.py'
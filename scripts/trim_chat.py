@@ -0,0 +1,40 @@
+"""
+Business: Chat retention job: trims chat_messages to the chat function's retention window and size cap
+Args: --database-url (or DATABASE_URL), --max-batches
+Returns: Prints the number of deleted messages; run it from cron alongside the sampled in-request trim
+"""
+import argparse
+import os
+from datetime import datetime
+
+import psycopg
+
+from local_functions import load_function
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--max-batches', type=int, default=1000, help='stop after this many batches')
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error('--database-url or DATABASE_URL is required')
+
+    chat = load_function('chat')
+    total = 0
+    with psycopg.connect(args.database_url, autocommit=True) as conn:
+        with conn.cursor() as cur:
+            # Autocommit: each batch DELETE is its own short transaction, keeping locks and WAL bursts small
+            for _ in range(args.max_batches):
+                deleted = chat.trim_messages(cur, datetime.utcnow())
+                total += deleted
+                if deleted == 0:
+                    break
+
+    print(f"deleted {total} chat messages "
+          f"(retention {chat.CHAT_RETENTION_DAYS} days, cap {chat.CHAT_MAX_MESSAGES} messages)")
+
+
+if __name__ == '__main__':
+    main()
@@ -186,17 +186,28 @@ const Index = () => {
 
   const loadAdminData = async () => {
     try {
-      const response = await fetch('https://functions.poehali.dev/1a6f3c0e-a502-475b-ab42-56dc3da305e1', {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
+      const allCharacters: Character[] = [];
+      let cursor = '';
+
+      // The admin listing is paginated; follow next_cursor until the last page
+      do {
+        const url = 'https://functions.poehali.dev/1a6f3c0e-a502-475b-ab42-56dc3da305e1' +
+          (cursor ? `?cursor=${encodeURIComponent(cursor)}` : '');
+        const response = await fetch(url, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+
+        if (!response.ok) return;
 
-      if (response.ok) {
         const data = await response.json();
-        setCharacters(data.characters || []);
-        setRarities(data.rarities || []);
-      }
+        allCharacters.push(...(data.characters || []));
+        if (!cursor) setRarities(data.rarities || []);
+        cursor = data.next_cursor || '';
+      } while (cursor);
+
+      setCharacters(allCharacters);
     } catch (error) {
       console.error('Failed to load admin data:', error);
     }